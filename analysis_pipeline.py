@@ -0,0 +1,327 @@
+"""
+Analysis Pipeline
+Splits hand analysis into an expensive equity stage, memoized on the spot,
+and a cheap strategy stage that re-runs on every strategy-only change
+"""
+
+import threading
+from collections import OrderedDict
+
+from poker_evaluator import create_deck
+
+
+class AnalysisPipeline:
+    """
+    Two-stage analysis for the app
+
+    Equity depends only on the cards and the opponents' range (their
+    tightness); position, bet facing and aggression only feed the strategy
+    stage. Final equity curves (one result per opponent count) are kept per
+    spot, so strategy-only changes and opponent-count changes never
+    re-simulate.
+    """
+
+    def __init__(self, equity_calc, strategy, max_opponents=3, time_budget_ms=600, memo_size=256,
+                 speculative_simulations=20000):
+        """
+        equity_calc: EquityCalculator used by the equity stage
+        strategy: StrategyEngine used by the strategy stage (its tightness
+                  also sets the opponents' range)
+        max_opponents: Opponent counts covered by every equity curve
+        time_budget_ms: Wall-clock budget for one spot's equity
+        memo_size: Spots whose final equity curves are kept (room for a
+                   flop's 47 turns and a turn's 46 rivers)
+        speculative_simulations: Trials per next card in iter_runouts
+        """
+        self.equity_calc = equity_calc
+        self.strategy = strategy
+        self.max_opponents = max_opponents
+        self.time_budget_ms = time_budget_ms
+        self.memo_size = memo_size
+        self.speculative_simulations = speculative_simulations
+        self._curves = OrderedDict()
+        # The app reads memoized curves while AnalysisWorker fills them
+        self._lock = threading.Lock()
+
+    def spot_key(self, hole_cards, community_cards, opponent_range=None):
+        """Everything the equity stage depends on"""
+        opponent_range = opponent_range or self.strategy.opponent_range()
+        return (tuple(hole_cards), tuple(community_cards), opponent_range.fingerprint)
+
+    def cached_curve(self, hole_cards, community_cards):
+        """Final equity curve for a spot if it has been computed, else None"""
+        key = self.spot_key(hole_cards, community_cards)
+        with self._lock:
+            curve = self._curves.get(key)
+            if curve is not None:
+                self._curves.move_to_end(key)
+        return curve
+
+    def iter_equity(self, hole_cards, community_cards):
+        """
+        Equity stage: stream equity curves ({opponent count: result}) for a
+        spot as they sharpen. A memoized spot yields its final curve at once.
+        """
+        curve = self.cached_curve(hole_cards, community_cards)
+        if curve is not None:
+            yield curve
+            return
+
+        opponent_range = self.strategy.opponent_range()
+        key = self.spot_key(hole_cards, community_cards, opponent_range)
+        for curve in self.equity_calc.iter_equity_by_opponents(
+            list(hole_cards),
+            list(community_cards),
+            self.max_opponents,
+            time_budget_ms=self.time_budget_ms,
+            opponent_range=opponent_range
+        ):
+            yield curve
+
+        self._remember(key, curve)
+
+    def next_cards(self, hole_cards, community_cards):
+        """Cards that can come on the next street (none once the river is out)"""
+        if not 3 <= len(community_cards) < 5:
+            return []
+        known = set(hole_cards) | set(community_cards)
+        return [c for c in create_deck() if c not in known]
+
+    def iter_runouts(self, hole_cards, community_cards, cancelled=None):
+        """
+        Speculative equity stage: compute the final equity curve for every
+        possible next card, so the real turn or river is a memo hit by the
+        time it is entered
+
+        Cards already memoized are skipped. Each card gets a fixed
+        speculative_simulations trials rather than the time budget.
+
+        Args:
+            cancelled: Optional zero-argument callable checked between
+                       chunks; speculation stops as soon as it returns True
+
+        Yields:
+            (next card, final equity curve) as each card completes
+        """
+        opponent_range = self.strategy.opponent_range()
+        for card in self.next_cards(hole_cards, community_cards):
+            board = list(community_cards) + [card]
+            key = self.spot_key(hole_cards, board, opponent_range)
+            with self._lock:
+                if key in self._curves:
+                    continue
+
+            stream = self.equity_calc.iter_equity_by_opponents(
+                list(hole_cards),
+                board,
+                self.max_opponents,
+                simulations=self.speculative_simulations,
+                opponent_range=opponent_range
+            )
+            for curve in stream:
+                if cancelled is not None and cancelled():
+                    stream.close()
+                    return
+
+            self._remember(key, curve)
+            yield card, curve
+
+    def runout_table(self, hole_cards, community_cards):
+        """
+        Runout equity by next card: dict of next card -> final equity curve,
+        or None for cards iter_runouts hasn't reached yet
+        """
+        keys = {
+            card: self.spot_key(hole_cards, list(community_cards) + [card])
+            for card in self.next_cards(hole_cards, community_cards)
+        }
+        with self._lock:
+            return {card: self._curves.get(key) for card, key in keys.items()}
+
+    def _remember(self, key, curve):
+        with self._lock:
+            self._curves[key] = curve
+            self._curves.move_to_end(key)
+            while len(self._curves) > self.memo_size:
+                self._curves.popitem(last=False)
+
+    def warm_up(self):
+        """Build the evaluator tables and the opponents' range ahead of the first spot"""
+        self.equity_calc.warm_up()
+        self.strategy.opponent_range().alias_table()
+
+    def recommend(self, equity_data, position, num_opponents, street, facing_bet=False):
+        """Strategy stage: a recommendation for an equity result (no simulation)"""
+        return self.strategy.get_recommendation(
+            equity_data, position, num_opponents, street, facing_bet
+        )
+
+    def clear(self):
+        """Forget all memoized equity"""
+        with self._lock:
+            self._curves.clear()
+
+
+class AnalysisWorker:
+    """
+    Runs the equity stage on one background thread; the latest request wins
+
+    Every submit() bumps a generation counter. The running analysis checks
+    it between streamed chunks and stops as soon as a newer request has
+    arrived, so a stale spot never holds up the current one, and results
+    are only posted while their request is still the latest.
+
+    Once a flop or turn spot is finished the thread keeps going on its
+    next-card runouts (AnalysisPipeline.iter_runouts) until a new request
+    supersedes it, so the real turn or river shows without simulating.
+    """
+
+    def __init__(self, pipeline, on_result, on_error=None, speculate=True, warm_up=False):
+        """
+        pipeline: AnalysisPipeline whose equity stage runs on the thread
+        on_result: Called with (curve, hole_cards, community_cards) for every
+                   estimate of the latest request, on the worker thread
+        on_error: Called with the exception if the latest request fails
+        speculate: Precompute next-card runouts while idle
+        warm_up: Run pipeline.warm_up() on the thread before any request
+        """
+        self.pipeline = pipeline
+        self.on_result = on_result
+        self.on_error = on_error
+        self.speculate = speculate
+        self.warm_up = warm_up
+        self.generation = 0
+        self._request = None   # (generation, key, hole_cards, community_cards)
+        self._active_key = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def submit(self, hole_cards, community_cards):
+        """
+        Analyze a spot in the background, superseding any earlier request.
+        A request for the spot already being analyzed is left running.
+
+        Returns:
+            The request's generation
+        """
+        key = self.pipeline.spot_key(hole_cards, community_cards)
+        with self._condition:
+            if key == self._active_key:
+                return self.generation
+            self.generation += 1
+            self._active_key = key
+            self._request = (self.generation, key, list(hole_cards), list(community_cards))
+            self._start()
+            self._condition.notify()
+            return self.generation
+
+    def start(self):
+        """Start the thread now (e.g. to warm up) instead of on the first submit()"""
+        with self._condition:
+            self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def cancel(self):
+        """Abandon the pending and running requests"""
+        with self._condition:
+            self.generation += 1
+            self._request = None
+            self._active_key = None
+
+    def is_current(self, generation):
+        """Whether a request is still the latest one"""
+        return generation == self.generation
+
+    def stop(self):
+        """Cancel outstanding work and end the worker thread"""
+        with self._condition:
+            self._stopped = True
+            self.generation += 1
+            self._request = None
+            self._condition.notify()
+
+    def _run(self):
+        if self.warm_up:
+            try:
+                self.pipeline.warm_up()
+            except Exception:
+                pass  # the first request reports any real problem
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, key, hole_cards, community_cards = self._request
+                self._request = None
+
+            try:
+                stream = self.pipeline.iter_equity(hole_cards, community_cards)
+                for curve in stream:
+                    if not self.is_current(generation):
+                        stream.close()  # stop simulating a stale spot
+                        break
+                    self.on_result(curve, hole_cards, community_cards)
+
+                if self.speculate and self.is_current(generation):
+                    stale = lambda: not self.is_current(generation)
+                    for _ in self.pipeline.iter_runouts(hole_cards, community_cards, stale):
+                        pass
+            except Exception as e:
+                if self.on_error is not None and self.is_current(generation):
+                    self.on_error(e)
+            finally:
+                with self._condition:
+                    if self._active_key == key and self.is_current(generation):
+                        self._active_key = None
+
+
+class Coalescer:
+    """
+    Collapses a burst of calls into one
+
+    Each call (re)starts a short timer; the callback runs once, with the
+    arguments of the last call, after calls have stopped for `delay` seconds.
+    The callback runs on a timer thread.
+    """
+
+    def __init__(self, callback, delay=0.15):
+        self.callback = callback
+        self.delay = delay
+        self._timer = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._generation += 1
+            self._timer = threading.Timer(self.delay, self._fire, (self._generation,) + args)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self, generation, *args):
+        with self._lock:
+            # A newer call may have arrived while this timer was firing
+            if generation != self._generation:
+                return
+            self._timer = None
+        self.callback(*args)
+
+    def pending(self):
+        """Whether a call is waiting to run"""
+        return self._timer is not None
+
+    def cancel(self):
+        """Drop the pending call, if any"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._generation += 1
@@ -0,0 +1,247 @@
+"""
+Batch Analysis
+Headless analysis of logged spots: JSONL in, JSONL out, no ui module needed
+
+    python batch_analysis.py hands.jsonl --output results.jsonl --workers 4
+    cat hands.jsonl | python batch_analysis.py > results.jsonl
+
+Each input line is one spot:
+
+    {"id": 17, "hole": ["Ah", "Kd"], "board": ["Qs", "7h", "2c"],
+     "position": "BTN", "opponents": 2, "facing_bet": true,
+     "tightness": 0.7, "aggression": 0.4}
+
+Only "hole" is required; cards may also be written as one string ("AhKd").
+Each output line holds the spot's id and street, the equity result and the
+recommendation, or an "error" message for a spot that couldn't be analyzed.
+Spots are read and written as a stream, so memory stays bounded however
+long the input is.
+"""
+
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from equity_calculator import EquityCalculator
+from poker_evaluator import parse_card
+from strategy_engine import StrategyEngine
+
+STREETS = {0: 'preflop', 3: 'flop', 4: 'turn', 5: 'river'}
+
+# Result keys copied from the equity result into each output line
+EQUITY_FIELDS = ('equity', 'win_pct', 'tie_pct', 'lose_pct', 'current_hand', 'hand_strength',
+                 'method', 'simulations', 'std_error')
+
+_analyzer = None  # SpotAnalyzer of a worker process
+
+
+def parse_cards(value):
+    """Cards from a list like ['Ah', 'Kd'] or a string like 'AhKd' / 'Ah Kd'"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        text = value.replace(',', '').replace(' ', '')
+        value = [text[i:i + 2] for i in range(0, len(text), 2)]
+    return [parse_card(card) for card in value]
+
+
+class SpotAnalyzer:
+    """
+    Runs the equity and strategy stages on one spot at a time, like the app
+    does: equity against the opponents' range (from their tightness) unless
+    random_opponents is set, then the recommendation
+    """
+
+    def __init__(self, simulations=2000, seed=None, cache_size=4096, random_opponents=False,
+                 backend='auto'):
+        self.equity_calc = EquityCalculator(simulations=simulations, seed=seed,
+                                            cache_size=cache_size, backend=backend)
+        self.strategy = StrategyEngine()
+        self.random_opponents = random_opponents
+
+    def analyze(self, record):
+        """
+        Analyze one spot
+
+        Args:
+            record: Dictionary parsed from an input line (see module docstring)
+
+        Returns:
+            Output dictionary for the spot
+        """
+        hole = parse_cards(record.get('hole'))
+        board = parse_cards(record.get('board'))
+        dead = parse_cards(record.get('dead'))
+        if len(board) not in STREETS:
+            raise ValueError(f"Board must have 0, 3, 4 or 5 cards, got {len(board)}")
+        known = hole + board + dead
+        if len(set(known)) != len(known):
+            raise ValueError("Duplicate cards")
+
+        street = STREETS[len(board)]
+        num_opponents = int(record.get('opponents', record.get('num_opponents', 3)))
+        if not 1 <= num_opponents <= 9:
+            raise ValueError("opponents must be 1-9")
+        position = record.get('position', 'BTN')
+        facing_bet = bool(record.get('facing_bet', False))
+        self.strategy.update_opponent_tendencies(
+            float(record.get('tightness', 0.5)), float(record.get('aggression', 0.5))
+        )
+
+        opponent_range = None if self.random_opponents else self.strategy.opponent_range()
+        equity = self.equity_calc.calculate_equity(hole, board, num_opponents, dead or None,
+                                                   opponent_range)
+        rec = self.strategy.get_recommendation(dict(equity), position, num_opponents, street,
+                                               facing_bet)
+
+        result = {'street': street}
+        result.update((field, equity[field]) for field in EQUITY_FIELDS)
+        result['action'] = rec['action']
+        result['adjusted_equity'] = rec['adjusted_equity']
+        result['reasoning'] = rec['reasoning']
+        return result
+
+    def analyze_line(self, number, line):
+        """Output dictionary for one input line; failures become an 'error' entry"""
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            return {'id': number, 'error': f"Invalid JSON: {e}"}
+
+        spot_id = record.get('id', number) if isinstance(record, dict) else number
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("Spot must be a JSON object")
+            result = {'id': spot_id}
+            result.update(self.analyze(record))
+            return result
+        except Exception as e:
+            # One bad spot must not end the run (or, with workers, the pool)
+            return {'id': spot_id, 'error': str(e) or type(e).__name__}
+
+    def reseed(self, seed):
+        """
+        Restart the calculator's seed stream and forget cached results, so
+        what follows depends only on `seed` and not on spots analyzed before
+        """
+        self.equity_calc.reseed(seed)
+        if self.equity_calc.cache is not None:
+            self.equity_calc.cache.clear()
+
+    def close(self):
+        self.equity_calc.close()
+
+
+def iter_lines(lines):
+    """(line number, text) for every non-blank line, numbered from 1"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield number, line
+
+
+def iter_chunks(items, size):
+    """Lists of up to `size` items, read lazily"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_stream(lines, workers=0, chunk_size=64, **options):
+    """
+    Analyze JSONL spots as a stream, yielding output dictionaries in input
+    order
+
+    With workers, chunks of chunk_size lines are analyzed in that many
+    processes; at most two chunks per worker are in flight, so memory is
+    bounded by the chunk size rather than the input length. With a seed,
+    each chunk of chunk_size lines is re-seeded from the seed plus its
+    first line number, with or without workers, so output doesn't depend
+    on the worker count or on which worker picks up which chunk.
+
+    Args:
+        lines: Iterable of JSONL text lines (e.g. an open file)
+        workers: Worker processes (0 = analyze in this process)
+        chunk_size: Lines sent to a worker at a time
+        options: SpotAnalyzer arguments (simulations, seed, ...)
+    """
+    numbered = iter_lines(lines)
+    seed = options.get('seed')
+
+    if workers <= 0:
+        analyzer = SpotAnalyzer(**options)
+        try:
+            for chunk in iter_chunks(numbered, chunk_size):
+                if seed is not None:
+                    analyzer.reseed(seed + chunk[0][0])
+                for number, line in chunk:
+                    yield analyzer.analyze_line(number, line)
+        finally:
+            analyzer.close()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init,
+                             initargs=(options,)) as pool:
+        pending = deque()
+        for chunk in iter_chunks(numbered, chunk_size):
+            chunk_seed = None if seed is None else seed + chunk[0][0]
+            pending.append(pool.submit(_worker_chunk, chunk, chunk_seed))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _worker_init(options):
+    global _analyzer
+    _analyzer = SpotAnalyzer(**options)
+
+
+def _worker_chunk(chunk, seed=None):
+    if seed is not None:
+        _analyzer.reseed(seed)
+    return [_analyzer.analyze_line(number, line) for number, line in chunk]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Analyze JSONL spots without the app')
+    parser.add_argument('input', nargs='?', default='-', help='JSONL file of spots (- for stdin)')
+    parser.add_argument('--output', default='-', help='JSONL file for results (- for stdout)')
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--simulations', type=int, default=2000)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    parser.add_argument('--backend', default='auto', choices=EquityCalculator.BACKENDS)
+    parser.add_argument('--random-opponents', action='store_true',
+                        help="Deal opponents random hands instead of a range from their tightness")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w')
+    errors = 0
+    try:
+        for result in analyze_stream(source, args.workers, args.chunk_size,
+                                     simulations=args.simulations, seed=args.seed,
+                                     cache_size=args.cache_size, backend=args.backend,
+                                     random_opponents=args.random_opponents):
+            errors += 'error' in result
+            sink.write(json.dumps(result) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
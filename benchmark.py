@@ -0,0 +1,336 @@
+"""
+Benchmarks
+Times the evaluator, the equity calculator and the end-to-end analyze path
+on a fixed, seeded corpus of spots, plus cold-start time in fresh
+interpreters, and writes the results as JSON
+
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+
+With --compare, any metric more than --tolerance worse than the baseline
+is reported and the exit status is 1. A baseline run with different
+settings can't be compared; that is reported with exit status 2.
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+
+from equity_calculator import EquityCalculator, np
+from poker_evaluator import EVALUATOR_VERSION, HandEvaluator, create_deck
+from strategy_engine import StrategyEngine
+from timing import latency_stats
+
+BENCHMARK_VERSION = 2
+
+STREETS = {'preflop': 0, 'flop': 3, 'turn': 4, 'river': 5}
+MAX_OPPONENTS = 3  # heads-up to 4-way, as at the app's 4-handed table
+POSITIONS = ['SB', 'BB', 'BTN', 'CO']
+
+# Metrics where bigger is better; every other metric is a time
+_HIGHER_IS_BETTER = ('hands_per_sec', 'sims_per_sec')
+
+# Cold-start budgets, in milliseconds of a fresh interpreter (after the
+# interpreter itself has started)
+COLD_START_BUDGET_MS = {
+    'engine_import': 300,   # import the engine; no ui, no tables built
+    'first_equity': 800,    # ...plus tables and one flop equity + recommendation
+    'app_start': 1500,      # import the app and build its views (Pythonista only)
+}
+
+_COLD_START_SCRIPTS = {
+    'engine_import': "import equity_calculator, strategy_engine",
+    'first_equity': (
+        "import equity_calculator, strategy_engine\n"
+        "from poker_evaluator import parse_card\n"
+        "hole = [parse_card('Ah'), parse_card('Kd')]\n"
+        "board = [parse_card(c) for c in ('Qs', '7h', '2c')]\n"
+        "equity = equity_calculator.EquityCalculator(simulations=1000).calculate_equity(hole, board, 2)\n"
+        "strategy_engine.StrategyEngine().get_recommendation(equity, 'BTN', 2, 'flop')"
+    ),
+    'app_start': "import poker_advisor\npoker_advisor.PokerAdvisorApp()",
+}
+
+# Wraps a cold-start script: times it and reports what it loaded
+_COLD_START_HARNESS = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], '<cold start>', 'exec'))
+elapsed = time.perf_counter() - start
+evaluator = sys.modules.get('poker_evaluator')
+preflop = sys.modules.get('preflop_equity')
+print(json.dumps({
+    'ms': elapsed * 1000,
+    'ui': 'ui' in sys.modules,
+    'tables': bool(evaluator and evaluator._HAND_CLASSES is not None),
+    'preflop_table': bool(preflop and preflop._table is not None),
+}))
+"""
+
+
+def build_corpus(seed=2024, spots_per_case=5):
+    """
+    Seeded spots for every street and 1 to MAX_OPPONENTS opponents
+
+    Returns:
+        List of dicts with 'street', 'hole', 'board', 'num_opponents',
+        'position' and 'facing_bet'; the same seed always gives the same list
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for street, board_size in STREETS.items():
+        for num_opponents in range(1, MAX_OPPONENTS + 1):
+            for _ in range(spots_per_case):
+                cards = rng.sample(create_deck(), 2 + board_size)
+                corpus.append({
+                    'street': street,
+                    'hole': cards[:2],
+                    'board': cards[2:],
+                    'num_opponents': num_opponents,
+                    'position': rng.choice(POSITIONS),
+                    'facing_bet': rng.random() < 0.5,
+                })
+    return corpus
+
+
+def bench_evaluator(seed=2024, hands=20000):
+    """Hands per second for evaluate_hand and evaluate_strength on 7-card hands"""
+    rng = random.Random(seed)
+    deck = create_deck()
+    corpus = [rng.sample(deck, 7) for _ in range(hands)]
+    HandEvaluator.evaluate_strength(corpus[0][:2], corpus[0][2:])  # build the tables
+
+    results = {}
+    for name, evaluate in (('evaluate_hand', HandEvaluator.evaluate_hand),
+                           ('evaluate_strength', HandEvaluator.evaluate_strength)):
+        start = time.perf_counter()
+        for cards in corpus:
+            evaluate(cards[:2], cards[2:])
+        elapsed = time.perf_counter() - start
+        results[name] = {'hands': hands, 'hands_per_sec': round(hands / elapsed)}
+    return results
+
+
+def bench_equity(corpus, simulations=2000, backend='auto', seed=2024):
+    """
+    calculate_equity latency per street, and trials per second for spots
+    that were sampled. The preflop table and the result cache are off, so
+    every spot is computed.
+    """
+    calc = EquityCalculator(simulations=simulations, backend=backend, seed=seed,
+                            preflop_table=False)
+    calc.warm_up()
+
+    timings = {street: [] for street in STREETS}
+    trials = {street: 0 for street in STREETS}
+    sampled = {street: 0.0 for street in STREETS}
+    for spot in corpus:
+        start = time.perf_counter()
+        result = calc.calculate_equity(spot['hole'], spot['board'], spot['num_opponents'])
+        elapsed = time.perf_counter() - start
+        timings[spot['street']].append(elapsed)
+        if result['method'] != 'exact':
+            trials[spot['street']] += result['simulations']
+            sampled[spot['street']] += elapsed
+    calc.close()
+
+    results = {}
+    for street, seconds in timings.items():
+        stats = latency_stats(seconds)
+        if sampled[street]:
+            stats['sims_per_sec'] = round(trials[street] / sampled[street])
+        results[street] = stats
+    return results
+
+
+def bench_analyze(corpus, simulations=1000, backend='auto', seed=2024, repeat=200):
+    """
+    The app's analyze path: calculate_equity (with the preflop table, as the
+    app runs it) followed by get_recommendation, plus get_recommendation on
+    its own
+    """
+    calc = EquityCalculator(simulations=simulations, backend=backend, seed=seed)
+    calc.warm_up()
+    strategy = StrategyEngine()
+
+    end_to_end = []
+    equities = []
+    for spot in corpus:
+        start = time.perf_counter()
+        equity = calc.calculate_equity(spot['hole'], spot['board'], spot['num_opponents'])
+        strategy.get_recommendation(dict(equity), spot['position'], spot['num_opponents'],
+                                    spot['street'], spot['facing_bet'])
+        end_to_end.append(time.perf_counter() - start)
+        equities.append(equity)
+    calc.close()
+
+    recommend = []
+    for _ in range(repeat):
+        for spot, equity in zip(corpus, equities):
+            data = dict(equity)
+            start = time.perf_counter()
+            strategy.get_recommendation(data, spot['position'], spot['num_opponents'],
+                                        spot['street'], spot['facing_bet'])
+            recommend.append(time.perf_counter() - start)
+
+    recommend_stats = latency_stats(recommend)
+    recommend_stats['mean_us'] = round(sum(recommend) / len(recommend) * 1e6, 2)
+    return {'end_to_end': latency_stats(end_to_end), 'get_recommendation': recommend_stats}
+
+
+def bench_cold_start(repeat=3, steps=None):
+    """
+    Time each cold-start step in fresh interpreters (median of `repeat`
+    runs) against COLD_START_BUDGET_MS. app_start is skipped where
+    Pythonista's ui module isn't available.
+
+    Returns:
+        Dict of step -> {'ms', 'budget_ms', 'within_budget', 'ui', 'tables',
+        'preflop_table'}, the last three saying what the step loaded
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for step in steps or _COLD_START_SCRIPTS:
+        if step == 'app_start' and find_spec('ui') is None:
+            continue
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, '-c', _COLD_START_HARNESS, _COLD_START_SCRIPTS[step]],
+                cwd=here, capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+        runs.sort(key=lambda r: r['ms'])
+        median = runs[len(runs) // 2]
+        results[step] = {
+            'ms': round(median['ms'], 1),
+            'budget_ms': COLD_START_BUDGET_MS[step],
+            'within_budget': median['ms'] <= COLD_START_BUDGET_MS[step],
+            'ui': median['ui'],
+            'tables': median['tables'],
+            'preflop_table': median['preflop_table'],
+        }
+    return results
+
+
+def run(seed=2024, spots_per_case=5, simulations=2000, backend='auto', hands=20000,
+        cold_start_repeat=3):
+    """Run every benchmark; returns a JSON-serializable report"""
+    corpus = build_corpus(seed, spots_per_case)
+    return {
+        'benchmark_version': BENCHMARK_VERSION,
+        'evaluator_version': EVALUATOR_VERSION,
+        'python': platform.python_version(),
+        'numpy': np.__version__ if np is not None else None,
+        'backend': backend,
+        'seed': seed,
+        'spots': len(corpus),
+        'simulations': simulations,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'evaluator': bench_evaluator(seed, hands),
+        'equity': bench_equity(corpus, simulations, backend, seed),
+        'analyze': bench_analyze(corpus, simulations, backend, seed),
+        'cold_start': bench_cold_start(cold_start_repeat),
+    }
+
+
+def _metrics(report, prefix=''):
+    """Flatten a report's numeric results to {'equity.flop.p50_ms': value}"""
+    flat = {}
+    for name, value in report.items():
+        path = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(_metrics(value, path + '.'))
+        elif path.split('.')[0] in ('evaluator', 'equity', 'analyze', 'cold_start') and \
+                isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline, current, tolerance=0.15):
+    """
+    Metrics that got worse by more than `tolerance` (a fraction)
+
+    Returns:
+        List of (metric, baseline value, current value), slowest first
+    """
+    for setting in ('benchmark_version', 'seed', 'spots', 'simulations', 'backend'):
+        if baseline.get(setting) != current.get(setting):
+            raise ValueError(f"Reports differ in {setting}: "
+                             f"{baseline.get(setting)} vs {current.get(setting)}")
+
+    before = _metrics(baseline)
+    regressions = []
+    for metric, value in _metrics(current).items():
+        old = before.get(metric)
+        if not old or metric.endswith(('.hands', '.budget_ms')):
+            continue
+        if metric.rsplit('.', 1)[-1] in _HIGHER_IS_BETTER:
+            change = old / value - 1 if value else float('inf')
+        else:
+            change = value / old - 1
+        if change > tolerance:
+            regressions.append((metric, old, value, change))
+    regressions.sort(key=lambda r: r[3], reverse=True)
+    return [(metric, old, value) for metric, old, value, _ in regressions]
+
+
+def _print_report(report):
+    for name, stats in report['evaluator'].items():
+        print(f"{name}: {stats['hands_per_sec']:,} hands/sec")
+    for street, stats in report['equity'].items():
+        rate = f", {stats['sims_per_sec']:,} sims/sec" if 'sims_per_sec' in stats else ''
+        print(f"calculate_equity {street}: p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms{rate}")
+    analyze = report['analyze']
+    print(f"analyze end-to-end: p50 {analyze['end_to_end']['p50_ms']} ms, "
+          f"p99 {analyze['end_to_end']['p99_ms']} ms")
+    print(f"get_recommendation: {analyze['get_recommendation']['mean_us']} us")
+    for step, stats in report['cold_start'].items():
+        status = 'ok' if stats['within_budget'] else 'OVER BUDGET'
+        print(f"cold start {step}: {stats['ms']} ms (budget {stats['budget_ms']} ms, {status})")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the evaluator and equity calculator')
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--spots', type=int, default=5, help='Spots per street and opponent count')
+    parser.add_argument('--simulations', type=int, default=2000)
+    parser.add_argument('--backend', default='auto', choices=EquityCalculator.BACKENDS)
+    parser.add_argument('--hands', type=int, default=20000)
+    parser.add_argument('--output', help='Write the report as JSON')
+    parser.add_argument('--compare', help='Baseline JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    report = run(args.seed, args.spots, args.simulations, args.backend, args.hands)
+    _print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(baseline, report, args.tolerance)
+        except ValueError as e:
+            print(f"Cannot compare with {args.compare}: {e}", file=sys.stderr)
+            return 2
+        for metric, old, new in regressions:
+            print(f"REGRESSION {metric}: {old} -> {new}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Dealing
+Draws only the cards a trial needs, with a partial Fisher-Yates shuffle
+"""
+
+import random
+
+try:
+    import numpy as np
+except ImportError:  # deal_rows is only used by the numpy backend
+    np = None
+
+
+def default_rng(seed=None):
+    """The RNG the simulations use unless EquityCalculator gets an rng_factory"""
+    return random.Random(seed)
+
+
+def deal(cards, count, rand):
+    """
+    Move `count` uniformly random cards of `cards` to its front, in place
+
+    Only the first `count` positions are shuffled, so a flop trial against
+    one opponent does 4 swaps instead of shuffling the ~47-card stub. The
+    list may be reused between calls: any permutation of the stub is a valid
+    starting point.
+
+    Args:
+        cards: List of cards (any values) to deal from
+        count: Number of cards needed
+        rand: Zero-argument callable returning floats in [0, 1), e.g. the
+              bound `random` method of a seeded RNG
+
+    Returns:
+        The same list, with the dealt cards in cards[:count]
+    """
+    size = len(cards)
+    for i in range(count):
+        j = i + int(rand() * (size - i))
+        cards[i], cards[j] = cards[j], cards[i]
+    return cards
+
+
+def deal_rows(decks, start, stop, rng):
+    """
+    Vectorized deal: partial Fisher-Yates over every row of a numpy deck
+    array, filling positions start..stop-1 of each row with random cards
+    from positions start..end
+
+    Args:
+        decks: Integer array of shape (n, stub_size), modified in place
+        rng: numpy Generator
+    """
+    n, size = decks.shape
+    rows = np.arange(n)
+    for i in range(start, stop):
+        j = rng.integers(i, size, size=n)
+        picked = decks[rows, j]
+        decks[rows, j] = decks[:, i]
+        decks[:, i] = picked
+    return decks
@@ -0,0 +1,326 @@
+"""
+Equity Cache
+Suit-isomorphic canonical keys, a bounded LRU cache of equity results and a
+persistent memory-mapped cache that survives app restarts
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from itertools import permutations
+
+from poker_evaluator import EVALUATOR_VERSION, HandEvaluator, card_to_index
+
+# Every relabelling of the 4 suits
+SUIT_PERMUTATIONS = list(permutations(range(4)))
+
+
+def canonical_key(hole_cards, community_cards, num_opponents, dead_cards=()):
+    """
+    Key that is identical for spots equal up to a suit relabelling
+
+    AhKh on Qh-Jh-2c and AsKs on Qs-Js-2d get the same key. Card order
+    within the hole cards, board and dead cards doesn't matter either.
+
+    Returns:
+        Tuple of (hole, board, dead) card-index tuples plus num_opponents
+    """
+    groups = [
+        [card_to_index(c) for c in hole_cards],
+        [card_to_index(c) for c in community_cards],
+        [card_to_index(c) for c in dead_cards],
+    ]
+
+    best = None
+    for perm in SUIT_PERMUTATIONS:
+        relabelled = tuple(
+            tuple(sorted((i & ~3) | perm[i & 3] for i in group))
+            for group in groups
+        )
+        if best is None or relabelled < best:
+            best = relabelled
+
+    return best + (num_opponents,)
+
+
+class EquityCache:
+    """Bounded least-recently-used cache of equity result dictionaries"""
+
+    def __init__(self, maxsize=512, backing=None):
+        """
+        maxsize: Maximum number of results kept; the least recently used
+                 result is evicted first
+        backing: Optional slower second-level cache (e.g. a
+                 PersistentEquityCache) consulted on misses and written through
+        """
+        self.maxsize = maxsize
+        self.backing = backing
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None"""
+        result = self._entries.get(key)
+        if result is None and self.backing is not None:
+            result = self.backing.get(key)
+            if result is not None:
+                self._store(key, result)
+
+        if result is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(result)
+
+    def put(self, key, result):
+        """Store a copy of result under key"""
+        self._store(key, result)
+        if self.backing is not None:
+            self.backing.put(key, result)
+
+    def _store(self, key, result):
+        self._entries[key] = dict(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all in-memory entries and reset the counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        """Close the backing cache, if any"""
+        if self.backing is not None:
+            self.backing.close()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+        if self.backing is not None:
+            stats['backing'] = self.backing.stats()
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PersistentEquityCache:
+    """
+    On-disk equity cache, memory-mapped so opening it costs nothing
+
+    The file is a fixed-size open-addressing hash table: a header followed
+    by `capacity` fixed-width slots. A key hashes to a home slot and may
+    live in any of the PROBE_LIMIT slots after it. Lookups read slots
+    straight from the mapping; misses are written into an empty slot in the
+    probe window, or over the least recently used one when the window is
+    full, so the file never grows past its cap. Use stamps come from a
+    clock that ticks once per put; a hit only re-stamps its slot once
+    REFRESH_AFTER puts have passed, so read-heavy warm starts leave the
+    mapped pages clean.
+
+    The header records the file format and EVALUATOR_VERSION; a file
+    written by a different version is wiped on open.
+    """
+
+    MAGIC = b'PKEQ'
+    FORMAT_VERSION = 1
+    PROBE_LIMIT = 8
+    REFRESH_AFTER = 1024
+
+    # magic, format version, evaluator version, capacity, entries, use clock
+    HEADER = struct.Struct('<4sHHIIQ')
+    HEADER_SIZE = 64
+
+    # key digest, last-use stamp (0 = empty slot), simulations, hand name,
+    # method, flags, win/tie/lose/equity/std_error percentages
+    SLOT = struct.Struct('<16sQIBBBx5f12x')
+
+    HAND_NAMES = ['Incomplete Hand'] + [name for _, name in HandEvaluator.STRENGTH_BOUNDS]
+    METHODS = ['monte_carlo', 'exact', 'stratified', 'table']
+    FLAG_FINAL = 1
+    FLAG_VS_RANGE = 2
+
+    def __init__(self, path, capacity=65536):
+        """
+        path: Cache file, created if missing; an existing file that isn't
+              an equity cache, or holds one of another capacity, raises
+              ValueError instead of being overwritten
+        capacity: Number of slots (the file is about capacity * 64 bytes)
+        """
+        self.path = path
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        size = self.HEADER_SIZE + capacity * self.SLOT.size
+        if not self._header_matches(size):
+            # Only a missing or empty file, or a cache file from another
+            # version, gets here; anything else raised above
+            with open(path, 'wb') as f:
+                f.truncate(size)
+                f.write(self.HEADER.pack(self.MAGIC, self.FORMAT_VERSION, EVALUATOR_VERSION,
+                                         capacity, 0, 0))
+
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), size)
+        _, _, _, _, self._count, self._clock = self.HEADER.unpack_from(self._map, 0)
+
+    def _header_matches(self, size):
+        """
+        Whether an existing file was written with this format, evaluator
+        and size. Raises ValueError for a file that isn't an equity cache
+        or a cache of another capacity, rather than wiping it.
+        """
+        try:
+            if not os.path.getsize(self.path):
+                return False
+            with open(self.path, 'rb') as f:
+                data = f.read(self.HEADER.size)
+        except OSError:
+            return False
+        if len(data) < self.HEADER.size or data[:4] != self.MAGIC:
+            raise ValueError(f"{self.path} is not an equity cache file")
+
+        _, format_version, evaluator_version, capacity, _, _ = self.HEADER.unpack(data)
+        if (format_version, evaluator_version) != (self.FORMAT_VERSION, EVALUATOR_VERSION):
+            return False
+        if capacity != self.capacity:
+            raise ValueError(f"{self.path} holds a cache of capacity {capacity}, "
+                             f"not {self.capacity}")
+        return os.path.getsize(self.path) == size
+
+    def _digest(self, key):
+        return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+    def _slots(self, digest):
+        """Offsets of the probe window for a key digest"""
+        home = int.from_bytes(digest[:8], 'little') % self.capacity
+        for i in range(self.PROBE_LIMIT):
+            yield self.HEADER_SIZE + ((home + i) % self.capacity) * self.SLOT.size
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _check_open(self):
+        if self._map is None:
+            raise ValueError("cache is closed")
+
+    def get(self, key):
+        """Return the stored result for key, or None"""
+        self._check_open()
+        digest = self._digest(key)
+        for offset in self._slots(digest):
+            slot = self.SLOT.unpack_from(self._map, offset)
+            if slot[1] == 0:
+                break
+            if slot[0] == digest:
+                self.hits += 1
+                if self._clock - slot[1] >= self.REFRESH_AFTER:
+                    self._map[offset + 16:offset + 24] = self._clock.to_bytes(8, 'little')
+                return self._decode(slot)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Store result under key, evicting the stalest slot in its window if full"""
+        self._check_open()
+        digest = self._digest(key)
+        target = None
+        oldest = None
+
+        for offset in self._slots(digest):
+            digest_at, stamp = self.SLOT.unpack_from(self._map, offset)[:2]
+            if stamp == 0 or digest_at == digest:
+                target = offset
+                if stamp == 0:
+                    self._count += 1
+                break
+            if oldest is None or stamp < oldest[0]:
+                oldest = (stamp, offset)
+
+        if target is None:
+            target = oldest[1]
+            self.evictions += 1
+
+        self.SLOT.pack_into(self._map, target, *self._encode(digest, result))
+        self._write_header()
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.FORMAT_VERSION, EVALUATOR_VERSION,
+                              self.capacity, self._count, self._clock)
+
+    def _encode(self, digest, result):
+        flags = (self.FLAG_FINAL if result.get('final') else 0) | \
+                (self.FLAG_VS_RANGE if result.get('vs_range') else 0)
+        return (
+            digest, self._tick(), result.get('simulations', 0),
+            self.HAND_NAMES.index(result['current_hand']),
+            self.METHODS.index(result.get('method', 'monte_carlo')), flags,
+            result['win_pct'], result['tie_pct'], result['lose_pct'],
+            result['equity'], result.get('std_error', 0.0),
+        )
+
+    def _decode(self, slot):
+        _, _, simulations, hand, method, flags, win, tie, lose, equity, std_error = slot
+        current_hand = self.HAND_NAMES[hand]
+        result = {
+            'win_pct': round(win, 1),
+            'tie_pct': round(tie, 1),
+            'lose_pct': round(lose, 1),
+            'equity': round(equity, 1),
+            'current_hand': current_hand,
+            'hand_strength': HandEvaluator.hand_strength_category(current_hand),
+            'method': self.METHODS[method],
+            'simulations': simulations,
+            'std_error': round(std_error, 2),
+        }
+        if flags & self.FLAG_FINAL:
+            result['final'] = True
+        if flags & self.FLAG_VS_RANGE:
+            result['vs_range'] = True
+        return result
+
+    def flush(self):
+        """Write dirty pages to disk"""
+        self._check_open()
+        self._map.flush()
+
+    def close(self):
+        """Flush and unmap the file"""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def stats(self):
+        """Hit/miss/eviction counters and fill level"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': self._count,
+            'capacity': self.capacity,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return self._count
@@ -4,19 +4,95 @@ Simulates poker hands to calculate win probability
 """
 
 import random
-from poker_evaluator import Card, HandEvaluator, create_deck
+import time
+from itertools import combinations
+from math import comb, factorial, sqrt
+import preflop_equity
+from dealing import deal, deal_rows, default_rng
+from equity_cache import EquityCache, PersistentEquityCache, canonical_key
+from hand_range import HandRange, cards_mask, combo_arrays
+from poker_evaluator import Card, HandEvaluator, card_to_index, create_deck, index_to_card
+
+try:
+    import numpy as np
+except ImportError:  # fall back to the pure-Python simulation loop
+    np = None
 
 class EquityCalculator:
     """Calculate hand equity using Monte Carlo simulation"""
 
-    def __init__(self, simulations=1000):
+    BACKENDS = ('auto', 'python', 'numpy')
+
+    # Below this many trials a call stays in-process; splitting it across
+    # workers would cost more in IPC than it saves
+    PARALLEL_THRESHOLD = 20000
+
+    # Conservative hand evaluations per millisecond, used to decide whether a
+    # timed call can afford exact enumeration
+    EVALUATIONS_PER_MS = {'python': 150, 'numpy': 3000}
+
+    # Smallest chunk a timed call runs; the first chunk also calibrates the rate
+    MIN_TIMED_CHUNK = 100
+
+    # Stratified sampling gives every runout the same number of trials, so
+    # it only runs when that uses at least this share of the requested trials
+    STRATIFIED_MIN_COVERAGE = 0.9
+
+    def __init__(self, simulations=1000, backend='auto', batch_size=25000, exact='auto',
+                 workers=0, seed=None, preflop_table=True, cache_size=0, cache_path=None,
+                 rng_factory=None):
         """
         Initialize equity calculator
         simulations: Number of Monte Carlo simulations to run (more = more accurate but slower)
+        backend: 'python' (one trial at a time), 'numpy' (batched arrays) or
+                 'auto' (numpy when it is installed)
+        batch_size: Trials dealt at once by the numpy backend (bounds memory use)
+        exact: 'auto' enumerates every runout and opponent holding whenever that
+               takes fewer hand evaluations than `simulations` trials, True
+               always enumerates, False always samples
+        workers: Worker processes to split trials across (0 = in-process;
+                 multiprocessing is not available on iOS)
+        seed: Makes results reproducible for a given sequence of calls and
+              worker count; every batch of trials draws its own seed from it
+        preflop_table: Answer preflop spots from the precomputed table in
+                       preflop_equity.json when it covers them
+        cache_size: Keep this many results in an LRU cache keyed by the
+                    suit-isomorphic spot (0 = no cache)
+        cache_path: Also persist results to this memory-mapped cache file, so
+                    they survive restarts (implies an in-memory cache)
+        rng_factory: Callable taking a seed (or None) and returning the RNG the
+                     pure-Python backend deals with; it only needs a random()
+                     method returning floats in [0, 1). Defaults to
+                     random.Random. Must be picklable when workers are used.
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == 'numpy' and np is None:
+            raise ImportError("The numpy backend requires numpy")
+
         self.simulations = simulations
+        self.backend = backend
+        self.batch_size = batch_size
+        self.exact = exact
+        self.workers = workers
+        self.seed = seed
+        self.preflop_table = preflop_table
+        self.rng_factory = rng_factory or default_rng
+        self.cache = None
+        if cache_size or cache_path:
+            backing = PersistentEquityCache(cache_path) if cache_path else None
+            self.cache = EquityCache(cache_size or 512, backing=backing)
+        self.reseed(seed)
+        self._pool = None
+        self._async_executor = None  # runs the chunks of the *_async methods
+
+    @property
+    def vectorized(self):
+        """Whether trials run through the batched numpy backend"""
+        return self.backend == 'numpy' or (self.backend == 'auto' and np is not None)
 
-    def calculate_equity(self, hole_cards, community_cards, num_opponents):
+    def calculate_equity(self, hole_cards, community_cards, num_opponents, dead_cards=None,
+                         opponent_range=None):
         """
         Calculate win probability for your hand
 
@@ -24,6 +100,12 @@ class EquityCalculator:
             hole_cards: List of 2 Card objects (your hole cards)
             community_cards: List of Card objects (flop/turn/river cards shown)
             num_opponents: Number of opponents still in the hand
+            dead_cards: Optional Card objects known to be out of play (e.g. folded)
+            opponent_range: Optional HandRange every opponent's hand is drawn
+                            from, or a list with one HandRange per opponent
+                            (None = random hands). Weighted ranges are
+                            sampled unless the preflop table covers them;
+                            a uniform range counts as random hands.
 
         Returns:
             Dictionary with win%, tie%, lose%, and hand analysis
@@ -31,102 +113,1161 @@ class EquityCalculator:
         if len(hole_cards) != 2:
             raise ValueError("Must have exactly 2 hole cards")
 
+        ranges = _opponent_ranges(opponent_range, num_opponents)
+        result = self._preflop_result(hole_cards, community_cards, num_opponents, dead_cards, ranges)
+        if result is not None:
+            return result
+
+        cache_key = self._cache_key(
+            hole_cards, community_cards, num_opponents, dead_cards, ('calculate', self.simulations),
+            ranges
+        )
+        if cache_key is not None:
+            result = self.cache.get(cache_key)
+            if result is not None:
+                return result
+
+        available_cards = self._available_cards(hole_cards, community_cards, dead_cards)
+        method = self._choose_method(
+            len(available_cards), 5 - len(community_cards), num_opponents, self.simulations, ranges
+        )
+
+        if method == 'exact':
+            wins, ties, losses = self._enumerate(
+                hole_cards, community_cards, available_cards, num_opponents
+            )
+        elif method == 'stratified':
+            wins, ties, losses = self._simulate_stratified(
+                hole_cards, community_cards, available_cards, num_opponents, self.simulations
+            )
+        else:
+            wins, ties, losses = self._simulate(
+                hole_cards, community_cards, available_cards, num_opponents, self.simulations,
+                ranges=ranges
+            )
+
+        result = self._build_result(wins, ties, losses, hole_cards, community_cards, method, ranges)
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+        return result
+
+    def calculate_equity_adaptive(self, hole_cards, community_cards, num_opponents,
+                                  target_error=0.5, max_simulations=200000, chunk_size=None,
+                                  dead_cards=None, opponent_range=None):
+        """
+        Calculate equity, stopping as soon as it is precise enough
+
+        Trials run in chunks until the standard error of the equity estimate
+        is at most target_error percentage points or max_simulations trials
+        have run. Clear-cut spots stop after the first chunk or two. Spots that
+        enumerate exactly within max_simulations are enumerated instead.
+
+        Args:
+            target_error: Target standard error, in equity percentage points
+            max_simulations: Upper bound on trials
+            chunk_size: Trials between precision checks (default: start
+                        small and double each check up to the batch size,
+                        so clear-cut spots stop after a few thousand trials)
+            opponent_range: As for calculate_equity
+
+        Returns:
+            Same dictionary as calculate_equity; 'simulations' and
+            'std_error' report what was actually achieved
+        """
+        if len(hole_cards) != 2:
+            raise ValueError("Must have exactly 2 hole cards")
+        if max_simulations < 1:
+            raise ValueError("max_simulations must be at least 1")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        ranges = _opponent_ranges(opponent_range, num_opponents)
+        result = self._preflop_result(hole_cards, community_cards, num_opponents, dead_cards, ranges)
+        if result is not None:
+            return result
+
+        available_cards = self._available_cards(hole_cards, community_cards, dead_cards)
+        method = self._choose_method(
+            len(available_cards), 5 - len(community_cards), num_opponents, max_simulations, ranges
+        )
+
+        if method == 'exact':
+            wins, ties, losses = self._enumerate(
+                hole_cards, community_cards, available_cards, num_opponents
+            )
+            return self._build_result(wins, ties, losses, hole_cards, community_cards, method,
+                                      ranges)
+
+        for wins, ties, losses in self._iter_counts(hole_cards, community_cards, available_cards,
+                                                    num_opponents, max_simulations, chunk_size,
+                                                    ranges):
+            total = wins + ties + losses
+            if _std_error(wins / total, ties / total, total) <= target_error:
+                break
+
+        return self._build_result(wins, ties, losses, hole_cards, community_cards, ranges=ranges)
+
+    def calculate_equity_timed(self, hole_cards, community_cards, num_opponents, time_budget_ms=150,
+                               max_simulations=None, dead_cards=None, opponent_range=None):
+        """
+        Calculate equity within a time budget
+
+        Runs as many trials as fit before the deadline and returns the
+        estimate so far. Chunk sizes follow the measured trial rate, so the
+        call overshoots the budget by at most a fraction of one chunk.
+        Spots that can be enumerated within the budget are enumerated.
+
+        Args:
+            time_budget_ms: Wall-clock budget in milliseconds
+            max_simulations: Optional cap on trials (None = until the deadline)
+            opponent_range: As for calculate_equity
+
+        Returns:
+            Same dictionary as calculate_equity plus 'elapsed_ms'
+        """
+        if len(hole_cards) != 2:
+            raise ValueError("Must have exactly 2 hole cards")
+
+        start = time.perf_counter()
+        deadline = start + time_budget_ms / 1000
+
+        ranges = _opponent_ranges(opponent_range, num_opponents)
+        result = self._preflop_result(hole_cards, community_cards, num_opponents, dead_cards, ranges)
+        if result is None:
+            available_cards = self._available_cards(hole_cards, community_cards, dead_cards)
+
+            affordable = self._affordable_simulations(time_budget_ms, num_opponents)
+            if max_simulations is not None:
+                affordable = min(affordable, max_simulations)
+            method = self._choose_method(
+                len(available_cards), 5 - len(community_cards), num_opponents, affordable, ranges
+            )
+
+            if method == 'exact':
+                wins, ties, losses = self._enumerate(
+                    hole_cards, community_cards, available_cards, num_opponents
+                )
+            else:
+                method = 'monte_carlo'
+                wins, ties, losses = self._simulate_until(
+                    hole_cards, community_cards, available_cards, num_opponents,
+                    deadline, max_simulations, ranges
+                )
+            result = self._build_result(wins, ties, losses, hole_cards, community_cards, method,
+                                        ranges)
+
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    def iter_equity(self, hole_cards, community_cards, num_opponents, simulations=None,
+                    time_budget_ms=None, chunk_size=None, dead_cards=None, opponent_range=None):
+        """
+        Stream equity estimates that sharpen as trials accumulate
+
+        Yields a result dictionary (same keys as calculate_equity, plus
+        'final') after every chunk of trials. The first chunk is small so a
+        rough estimate arrives within milliseconds; later chunks double in
+        size. Table lookups and exact enumerations yield a single final result.
+
+        Args:
+            simulations: Total trials (defaults to self.simulations, or no
+                         limit when only a time budget is given)
+            time_budget_ms: Optional deadline for the whole stream
+            chunk_size: Fixed trials per chunk instead of the doubling schedule
+            opponent_range: As for calculate_equity
+        """
+        for results in self._iter_results(hole_cards, community_cards, num_opponents, False,
+                                          simulations, time_budget_ms, chunk_size, dead_cards,
+                                          opponent_range):
+            yield results[-1]
+
+    def iter_equity_by_opponents(self, hole_cards, community_cards, max_opponents=3,
+                                 simulations=None, time_budget_ms=None, chunk_size=None,
+                                 dead_cards=None, opponent_range=None):
+        """
+        Stream equity against every opponent count from 1 to max_opponents
+
+        Like iter_equity, but each trial deals max_opponents hands once and
+        scores the hero against the first 1, 2, ... of them, so the whole
+        curve costs barely more than the max_opponents run alone. Against
+        weighted ranges every count runs its own trials instead. Every
+        count's final result is cached under the same key iter_equity uses,
+        so switching opponent counts afterwards is a cache hit.
+
+        Yields:
+            Dictionary of opponent count -> result dictionary
+        """
+        for results in self._iter_results(hole_cards, community_cards, max_opponents, True,
+                                          simulations, time_budget_ms, chunk_size, dead_cards,
+                                          opponent_range):
+            yield dict(enumerate(results, 1))
+
+    def calculate_equity_by_opponents(self, hole_cards, community_cards, max_opponents=3,
+                                      dead_cards=None, opponent_range=None):
+        """
+        Equity against 1 to max_opponents opponents from one pass of
+        self.simulations trials
+
+        Returns:
+            Dictionary of opponent count -> result dictionary
+        """
+        for curve in self.iter_equity_by_opponents(hole_cards, community_cards, max_opponents,
+                                                   dead_cards=dead_cards,
+                                                   opponent_range=opponent_range):
+            pass
+        return curve
+
+    def _iter_results(self, hole_cards, community_cards, num_opponents, nested, simulations,
+                      time_budget_ms, chunk_size, dead_cards, opponent_range):
+        """
+        Streaming engine behind iter_equity and iter_equity_by_opponents.
+        Yields a list of results: one per opponent count 1..num_opponents
+        when `nested`, otherwise just the one for num_opponents.
+        """
+        if len(hole_cards) != 2:
+            raise ValueError("Must have exactly 2 hole cards")
+
+        ranges = _opponent_ranges(opponent_range, num_opponents)
+        counts = range(1, num_opponents + 1) if nested else (num_opponents,)
+
+        deadline = None
+        if time_budget_ms is not None:
+            deadline = time.perf_counter() + time_budget_ms / 1000
+        elif simulations is None:
+            simulations = self.simulations
+
+        results = [
+            self._preflop_result(hole_cards, community_cards, k, dead_cards, ranges)
+            for k in counts
+        ]
+        if None not in results:
+            for result in results:
+                result['final'] = True
+            yield results
+            return
+
+        cache_keys = [
+            self._cache_key(hole_cards, community_cards, k, dead_cards,
+                            ('stream', simulations, time_budget_ms, chunk_size),
+                            ranges[:k] if ranges else None)
+            for k in counts
+        ]
+        if self.cache is not None:
+            results = [self.cache.get(key) for key in cache_keys]
+            if None not in results:
+                yield results
+                return
+
+        available_cards = self._available_cards(hole_cards, community_cards, dead_cards)
+        affordable = simulations
+        if deadline is not None:
+            affordable = self._affordable_simulations(time_budget_ms, num_opponents)
+            if simulations is not None:
+                affordable = min(affordable, simulations)
+
+        method = self._choose_method(
+            len(available_cards), 5 - len(community_cards), num_opponents, affordable, ranges
+        )
+        if method == 'exact':
+            # Fewer opponents never cost more to enumerate than the most
+            results = []
+            for k, cache_key in zip(counts, cache_keys):
+                wins, ties, losses = self._enumerate(
+                    hole_cards, community_cards, available_cards, k
+                )
+                result = self._build_result(wins, ties, losses, hole_cards, community_cards, method,
+                                            ranges[:k] if ranges else None)
+                result['final'] = True
+                if cache_key is not None:
+                    self.cache.put(cache_key, result)
+                results.append(result)
+            yield results
+            return
+
+        chunk = chunk_size or (1000 if self.vectorized else 200)
+        max_chunk = chunk_size or self.batch_size * max(1, self.workers)
+        totals = [[0, 0, 0] for _ in counts]
+        done = 0
+        started = time.perf_counter()
+
+        while True:
+            if simulations is not None:
+                chunk = min(chunk, simulations - done)
+            tallies = self._simulate(hole_cards, community_cards, available_cards, num_opponents,
+                                     chunk, ranges=ranges, nested=nested)
+            for total, tally in zip(totals, tallies if nested else [tallies]):
+                for i in range(3):
+                    total[i] += tally[i]
+            done += chunk
+
+            final = (
+                (simulations is not None and done >= simulations) or
+                (deadline is not None and time.perf_counter() >= deadline)
+            )
+            results = []
+            for (wins, ties, losses), k, cache_key in zip(totals, counts, cache_keys):
+                result = self._build_result(wins, ties, losses, hole_cards, community_cards,
+                                            ranges=ranges[:k] if ranges else None)
+                result['final'] = final
+                if final and cache_key is not None:
+                    self.cache.put(cache_key, result)
+                results.append(result)
+            yield results
+            if final:
+                return
+
+            chunk = min(chunk * 2, max_chunk)
+            if deadline is not None:
+                # Don't start a chunk that would run well past the deadline
+                now = time.perf_counter()
+                rate = done / max(now - started, 1e-6)
+                chunk = max(self.MIN_TIMED_CHUNK, min(chunk, int(rate * (deadline - now))))
+
+    def _affordable_simulations(self, time_budget_ms, num_opponents):
+        """Trials a time budget affords at a conservative evaluation rate"""
+        backend = 'numpy' if self.vectorized else 'python'
+        return int(time_budget_ms * self.EVALUATIONS_PER_MS[backend] / (1 + num_opponents))
+
+    def _simulate_until(self, hole_cards, community_cards, available_cards, num_opponents,
+                        deadline, max_simulations=None, ranges=None):
+        """Run chunks of trials until the deadline. Returns: (wins, ties, losses)"""
+        chunk = self.MIN_TIMED_CHUNK
+        wins = 0
+        ties = 0
+        losses = 0
+        done = 0
+        started = time.perf_counter()
+
+        while True:
+            if max_simulations is not None:
+                chunk = min(chunk, max_simulations - done)
+            w, t, l = self._simulate(hole_cards, community_cards, available_cards, num_opponents, chunk,
+                                     ranges=ranges)
+            wins += w
+            ties += t
+            losses += l
+            done += chunk
+
+            now = time.perf_counter()
+            if now >= deadline or (max_simulations is not None and done >= max_simulations):
+                break
+
+            # Aim the next chunk at ~90% of the remaining time
+            rate = done / max(now - started, 1e-6)
+            chunk = int(rate * (deadline - now) * 0.9)
+            if chunk < self.MIN_TIMED_CHUNK:
+                break
+            chunk = min(chunk, self.batch_size * max(1, self.workers))
+
+        return wins, ties, losses
+
+    def _iter_counts(self, hole_cards, community_cards, available_cards, num_opponents,
+                     max_simulations, chunk_size=None, ranges=None):
+        """
+        Run Monte Carlo trials in chunks, yielding running (wins, ties, losses).
+        Without a chunk_size, chunks start small and double (as in
+        _iter_results), so the caller can stop early on clear-cut spots.
+        """
+        chunk = chunk_size or (1000 if self.vectorized else 200)
+        max_chunk = chunk_size or self.batch_size * max(1, self.workers)
+
         wins = 0
         ties = 0
         losses = 0
+        done = 0
+
+        while done < max_simulations:
+            n = min(chunk, max_simulations - done)
+            w, t, l = self._simulate(hole_cards, community_cards, available_cards, num_opponents, n,
+                                     ranges=ranges)
+            wins += w
+            ties += t
+            losses += l
+            done += n
+            chunk = min(chunk * 2, max_chunk)
+            yield wins, ties, losses
+
+    def _preflop_result(self, hole_cards, community_cards, num_opponents, dead_cards=None,
+                        ranges=None):
+        """
+        Result from the preflop equity table, or None if it doesn't apply.
+        Weighted ranges are covered when every opponent plays the same range
+        and the table was built for it.
+        """
+        if not self.preflop_table or community_cards or dead_cards:
+            return None
+
+        sampled = _sampled_ranges(ranges)
+        if sampled and len({r.fingerprint for r in sampled}) != 1:
+            return None
+
+        result = preflop_equity.lookup(hole_cards, num_opponents, sampled[0] if sampled else None)
+        if result is None:
+            return None
+
+        result['current_hand'] = HandEvaluator.strength_name(0)
+        result['hand_strength'] = HandEvaluator.hand_strength_category(result['current_hand'])
+        result['method'] = 'table'
+        result['std_error'] = round(_std_error(
+            result['win_pct'] / 100, result['tie_pct'] / 100, result['simulations']
+        ), 2)
+        if ranges:
+            result['vs_range'] = True
+        return result
+
+    def _cache_key(self, hole_cards, community_cards, num_opponents, dead_cards, request,
+                   ranges=None):
+        """
+        Cache key for a spot, or None without a cache. `request` captures
+        the call's own settings; the calculator's sampling settings are added.
+        Ranges are suit-symmetric and opponents interchangeable, so sorted
+        range fingerprints keep the key suit-isomorphic.
+        """
+        if self.cache is None:
+            return None
+        spot = canonical_key(hole_cards, community_cards, num_opponents, dead_cards or ())
+        range_key = tuple(sorted(r.fingerprint for r in ranges)) if ranges else None
+        return spot + request + (range_key, self.exact, self.preflop_table)
+
+    def _available_cards(self, hole_cards, community_cards, dead_cards=None):
+        """Deck minus known cards"""
+        known = cards_mask(hole_cards + community_cards + list(dead_cards or []))
+        return [c for c in create_deck() if not known >> c.index & 1]
+
+    def _choose_method(self, available_count, cards_to_deal, num_opponents, simulations,
+                       ranges=None):
+        """
+        Pick how to compute equity, comparing hand evaluations needed:
+          'exact'       - every runout x every set of opponent holdings
+          'stratified'  - every runout, opponent holdings sampled within each
+                          (only when an equal share per runout keeps nearly
+                          all of the requested trials)
+          'monte_carlo' - runouts and holdings both sampled (always the case
+                          against weighted ranges)
+        """
+        if self.exact is False or _sampled_ranges(ranges):
+            return 'monte_carlo'
+
+        runouts = comb(available_count, cards_to_deal)
+        remaining = available_count - cards_to_deal
+        holdings = comb(remaining, 2)
+        holding_sets = _count_holding_sets(remaining, num_opponents)
+
+        # Each runout scores the hero once and every holding once; multiway
+        # enumeration also walks every disjoint set of holdings
+        exact_cost = runouts * (1 + holdings + (holding_sets if num_opponents > 1 else 0))
+        sampled_cost = simulations * (1 + num_opponents)
+
+        if self.exact is True or exact_cost <= sampled_cost:
+            return 'exact'
+        if 1 < runouts <= simulations and _stratified_trials(runouts, simulations) >= (
+                simulations * self.STRATIFIED_MIN_COVERAGE):
+            return 'stratified'
+        return 'monte_carlo'
+
+    def _simulate(self, hole_cards, community_cards, available_cards, num_opponents,
+                  simulations, runouts=None, ranges=None, nested=False):
+        """
+        Run Monte Carlo trials, split across the worker pool when it is
+        enabled and the call is large enough. Returns: (wins, ties, losses),
+        or with `nested` a list of them for the first 1..num_opponents
+        opponents of every trial
+        """
+        ranges = _sampled_ranges(ranges)
+        if ranges and nested:
+            # Range opponents are dealt before the board, so the hands of
+            # opponents who aren't playing would still shape the board and
+            # bias the smaller counts; run every count on its own instead
+            return [
+                self._simulate(hole_cards, community_cards, available_cards, k, simulations,
+                               runouts, ranges[:k])
+                for k in range(1, num_opponents + 1)
+            ]
+        if self.workers > 1 and simulations >= self.PARALLEL_THRESHOLD:
+            return self._simulate_parallel(
+                hole_cards, community_cards, available_cards, num_opponents, simulations, runouts,
+                ranges, nested
+            )
+        return self._run_trials(
+            hole_cards, community_cards, available_cards, num_opponents,
+            simulations, runouts, 0, self._next_seed(), ranges, nested
+        )
+
+    def _run_trials(self, hole_cards, community_cards, available_cards, num_opponents,
+                    simulations, runouts, offset, seed, ranges=None, nested=False):
+        """Run trials in this process on the configured backend"""
+        if ranges:
+            if self.vectorized:
+                return self._simulate_numpy_ranges(
+                    hole_cards, community_cards, available_cards, ranges, simulations, seed, nested
+                )
+            return self._simulate_python_ranges(
+                hole_cards, community_cards, available_cards, ranges, simulations, seed, nested
+            )
+        if self.vectorized:
+            return self._simulate_numpy(
+                hole_cards, community_cards, available_cards, num_opponents,
+                simulations, runouts, offset, seed, nested
+            )
+        return self._simulate_python(
+            hole_cards, community_cards, available_cards, num_opponents,
+            simulations, runouts, offset, seed, nested
+        )
+
+    def _simulate_stratified(self, hole_cards, community_cards, available_cards, num_opponents, simulations):
+        """
+        Enumerate every board runout and sample opponent holdings within each.
+        Every runout is equally likely and gets the same number of trials, so
+        the counts can be summed directly. When that would drop too many of
+        the requested trials, plain Monte Carlo runs instead.
+        Returns: (wins, ties, losses)
+        """
+        cards_to_deal = 5 - len(community_cards)
+        runouts = list(combinations(available_cards, cards_to_deal))
+        trials = _stratified_trials(len(runouts), simulations)
+        if trials < simulations * self.STRATIFIED_MIN_COVERAGE:
+            return self._simulate(
+                hole_cards, community_cards, available_cards, num_opponents, simulations
+            )
+
+        return self._simulate(
+            hole_cards, community_cards, available_cards, num_opponents, trials, runouts
+        )
+
+    def _simulate_parallel(self, hole_cards, community_cards, available_cards, num_opponents,
+                           simulations, runouts, ranges=None, nested=False):
+        """Split trials into one chunk per worker and sum the results"""
+        pool = self._get_pool()
+        chunk = -(-simulations // self.workers)
+
+        hole = [card_to_index(c) for c in hole_cards]
+        board = [card_to_index(c) for c in community_cards]
+        stub = [card_to_index(c) for c in available_cards]
+        runout_indices = (
+            [[card_to_index(c) for c in runout] for runout in runouts]
+            if runouts is not None else None
+        )
 
-        # Create available cards (deck minus known cards)
-        known_cards = set(hole_cards + community_cards)
-        available_cards = [c for c in create_deck() if c not in known_cards]
+        tasks = [
+            (self.backend, self.batch_size, self.rng_factory, hole, board, stub, num_opponents,
+             min(chunk, simulations - offset), runout_indices, offset, self._next_seed(), ranges)
+            for offset in range(0, simulations, chunk)
+        ]
+
+        # Workers always report every opponent count; sum them position-wise
+        totals = [[0, 0, 0] for _ in range(num_opponents)]
+        for tallies in pool.map(_worker_trials, tasks):
+            for total, tally in zip(totals, tallies):
+                for i in range(3):
+                    total[i] += tally[i]
+        return _tally_result(totals, nested)
+
+    def reseed(self, seed):
+        """Restart the reproducible seed stream, as if constructed with `seed`"""
+        self.seed = seed
+        self._seed_stream = random.Random(seed) if seed is not None else None
+
+    def _next_seed(self):
+        """Next seed from the reproducible stream, or None for fresh entropy"""
+        if self._seed_stream is None:
+            return None
+        return self._seed_stream.getrandbits(64)
+
+    def _get_pool(self):
+        """The worker pool, started on first use and kept warm between calls"""
+        if self._pool is None:
+            # Imported here: only multi-process runs pay for it
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_worker_init)
+        return self._pool
+
+    def warm_up(self):
+        """Start the worker pool and build lookup tables ahead of the first call"""
+        HandEvaluator.evaluate_strength(create_deck()[:5], [])
+        if self.vectorized:
+            HandEvaluator.evaluate_strength_array(np.arange(5)[None])
+        if self.workers > 1:
+            pool = self._get_pool()
+            for future in [pool.submit(_worker_init) for _ in range(self.workers)]:
+                future.result()
+
+    def close(self):
+        """Shut down the worker pool and close the persistent cache"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._async_executor is not None:
+            self._async_executor.shutdown()
+            self._async_executor = None
+        if self.cache is not None:
+            self.cache.close()
+
+    def _enumerate(self, hole_cards, community_cards, available_cards, num_opponents):
+        """
+        Exact equity: every board runout against every set of opponent
+        holdings. Opponents are interchangeable, so unordered sets of disjoint
+        holdings are all equally likely. Returns: (wins, ties, losses)
+        """
+        if self.vectorized and num_opponents == 1:
+            return self._enumerate_heads_up_numpy(hole_cards, community_cards, available_cards)
+
+        evaluate = HandEvaluator.evaluate_strength_batch
+        hole = [c.index for c in hole_cards]
+        stub = [c.index for c in available_cards]
+        cards_to_deal = 5 - len(community_cards)
+        wins = 0
+        ties = 0
+        losses = 0
+
+        for runout in combinations(stub, cards_to_deal):
+            board = [c.index for c in community_cards] + list(runout)
+            rest = [i for i in stub if i not in runout]
+
+            # Every holding is scored against the same board in one batch
+            pairs = list(combinations(rest, 2))
+            your_hand, *strengths = evaluate(board, [hole] + pairs)
+            holdings = [
+                ((1 << a) | (1 << b), strength)
+                for (a, b), strength in zip(pairs, strengths)
+            ]
+
+            for holding_set in combinations(holdings, num_opponents):
+                if num_opponents > 1 and not _disjoint(holding_set):
+                    continue
+                result = self._compare_hands(your_hand, [strength for _, strength in holding_set])
+                if result == 'win':
+                    wins += 1
+                elif result == 'tie':
+                    ties += 1
+                else:
+                    losses += 1
+
+        return wins, ties, losses
+
+    def _enumerate_heads_up_numpy(self, hole_cards, community_cards, available_cards):
+        """Exact heads-up equity with runouts x holdings scored as arrays"""
+        hole = np.array([card_to_index(c) for c in hole_cards])
+        board = np.array([card_to_index(c) for c in community_cards], dtype=np.intp)
+        stub = [card_to_index(c) for c in available_cards]
+
+        cards_to_deal = 5 - len(community_cards)
+        runouts = np.array(list(combinations(stub, cards_to_deal)), dtype=np.intp)
+        holdings = np.array(list(combinations(stub, 2)))
+
+        # A holding is only valid with runouts that don't share a card with it
+        card_bits = np.int64(1) << np.arange(52, dtype=np.int64)
+        runout_masks = card_bits[runouts].sum(axis=1)
+        holding_masks = card_bits[holdings].sum(axis=1)
+
+        # Every runout leaves the same number of holdings
+        per_runout = comb(len(stub) - cards_to_deal, 2)
+
+        wins = 0
+        ties = 0
+        losses = 0
+        chunk = max(1, self.batch_size // len(holdings))
+
+        for start in range(0, len(runouts), chunk):
+            block = runouts[start:start + chunk]
+            r = len(block)
+            boards = np.concatenate([np.broadcast_to(board, (r, len(board))), block], axis=1)
+
+            your_hands = HandEvaluator.evaluate_strength_array(
+                np.concatenate([np.broadcast_to(hole, (r, 2)), boards], axis=1)
+            )
+
+            # Gather each runout's valid holdings before scoring them: a
+            # holding that repeats a board card isn't a real hand (and would
+            # overflow the flush table)
+            valid = (runout_masks[start:start + r, None] & holding_masks[None, :]) == 0
+            valid_holdings = np.nonzero(valid)[1].reshape(r, per_runout)
+            opp_cards = np.concatenate([
+                holdings[valid_holdings],
+                np.broadcast_to(boards[:, None, :], (r, per_runout, boards.shape[1])),
+            ], axis=2)
+            opp_hands = HandEvaluator.evaluate_strength_array(opp_cards)
+
+            wins += int(np.count_nonzero(your_hands[:, None] > opp_hands))
+            ties += int(np.count_nonzero(your_hands[:, None] == opp_hands))
+            losses += int(np.count_nonzero(your_hands[:, None] < opp_hands))
+
+        return wins, ties, losses
+
+    def _simulate_python(self, hole_cards, community_cards, available_cards, num_opponents,
+                         simulations, runouts=None, offset=0, seed=None, nested=False):
+        """
+        Run trials one at a time, dealing only the cards each trial needs.
+        With `runouts`, trial i completes the board with
+        runouts[(offset + i) % len(runouts)] and only deals opponents.
+        Returns: (wins, ties, losses), or a list of them per opponent count
+        with `nested`
+        """
+        rand = self.rng_factory(seed).random
+        evaluate = HandEvaluator.evaluate_strength_batch
+        hands = [None] * (num_opponents + 1)
+        tallies = [[0, 0, 0] for _ in range(num_opponents)]
+        last = num_opponents - 1
+
+        # Cards travel as indices from here on; no Card objects per trial
+        hole = [c.index for c in hole_cards]
+        board = [c.index for c in community_cards]
+        stub = [c.index for c in available_cards]
 
         # How many community cards still to come
         cards_to_deal = 5 - len(community_cards)
+        opponent_cards_start = cards_to_deal
 
-        for _ in range(self.simulations):
-            # Shuffle available cards
-            random.shuffle(available_cards)
+        if runouts is not None:
+            runouts = [[c.index for c in runout] for runout in runouts]
+            boards = [board + runout for runout in runouts]
+            stubs = [[i for i in stub if i not in runout] for runout in runouts]
+            opponent_cards_start = 0
+        needed = opponent_cards_start + 2 * num_opponents
 
-            # Complete the board
-            simulated_board = community_cards + available_cards[:cards_to_deal]
+        for trial in range(offset, offset + simulations):
+            if runouts is not None:
+                simulated_board = boards[trial % len(boards)]
+                stub = deal(stubs[trial % len(stubs)], needed, rand)
+            else:
+                # Draw the rest of the board and the opponents' cards
+                deal(stub, needed, rand)
 
-            # Deal opponent hands
-            opponent_cards_start = cards_to_deal
-            opponent_hands = []
+                # Complete the board
+                simulated_board = board + stub[:cards_to_deal]
 
+            # Evaluate your hand and the opponents' against the shared board
+            hands[0] = hole
             for i in range(num_opponents):
-                opp_hole = available_cards[opponent_cards_start + i*2:opponent_cards_start + i*2 + 2]
-                opponent_hands.append(opp_hole)
+                start = opponent_cards_start + 2 * i
+                hands[i + 1] = stub[start:start + 2]
+            your_hand, *strengths = evaluate(simulated_board, hands)
 
-            # Evaluate your hand
-            your_hand = HandEvaluator.evaluate_hand(hole_cards, simulated_board)
+            # Tally against the best opponent so far
+            best_opponent = 0
+            for i, strength in enumerate(strengths):
+                if strength > best_opponent:
+                    best_opponent = strength
+                if nested or i == last:
+                    _tally(tallies[i], your_hand, best_opponent)
 
-            # Evaluate opponent hands
-            opponent_evals = [
-                HandEvaluator.evaluate_hand(opp_hole, simulated_board)
-                for opp_hole in opponent_hands
-            ]
+        return _tally_result(tallies, nested)
+
+    def _simulate_numpy(self, hole_cards, community_cards, available_cards, num_opponents,
+                        simulations, runouts=None, offset=0, seed=None, nested=False):
+        """
+        Run trials in batches of integer arrays. Each batch deals every board
+        and opponent hand at once with a partial Fisher-Yates shuffle per row,
+        then evaluates and tallies the whole batch with array operations.
+        With `runouts`, trial i uses runouts[(offset + i) % len(runouts)] as
+        the rest of the board and only the opponent hands are drawn.
+        Returns: (wins, ties, losses), or a list of them per opponent count
+        with `nested`
+        """
+        rng = np.random.default_rng(seed)
+
+        hole = np.array([card_to_index(c) for c in hole_cards])
+        board = np.array([card_to_index(c) for c in community_cards], dtype=np.intp)
+        stub = np.array([card_to_index(c) for c in available_cards])
+
+        cards_to_deal = 5 - len(community_cards)
+        needed = cards_to_deal + 2 * num_opponents
+        first_draw = 0
+
+        if runouts is not None:
+            # One stub per runout with the runout cards moved to the front
+            stubs = np.array([
+                [card_to_index(c) for c in runout] +
+                [card_to_index(c) for c in available_cards if c not in runout]
+                for runout in runouts
+            ])
+            first_draw = cards_to_deal
 
-            # Compare hands
-            result = self._compare_hands(your_hand, opponent_evals)
+        wins = [0] * num_opponents
+        ties = [0] * num_opponents
+        done = 0
 
-            if result == 'win':
-                wins += 1
-            elif result == 'tie':
-                ties += 1
+        while done < simulations:
+            n = min(self.batch_size, simulations - done)
+            rows = np.arange(n)
+
+            if runouts is None:
+                decks = np.tile(stub, (n, 1))
             else:
-                losses += 1
+                decks = stubs[(offset + done + rows) % len(stubs)]
+
+            # Partial Fisher-Yates: only the first `needed` positions are drawn
+            deal_rows(decks, first_draw, needed, rng)
+
+            boards = np.concatenate(
+                [np.broadcast_to(board, (n, len(board))), decks[:, :cards_to_deal]], axis=1
+            )
+
+            your_hands = HandEvaluator.evaluate_strength_array(
+                np.concatenate([np.broadcast_to(hole, (n, 2)), boards], axis=1)
+            )
+
+            best_opponent = np.zeros(n, dtype=your_hands.dtype)
+            for i in range(num_opponents):
+                start = cards_to_deal + 2 * i
+                opp_hands = HandEvaluator.evaluate_strength_array(
+                    np.concatenate([decks[:, start:start + 2], boards], axis=1)
+                )
+                np.maximum(best_opponent, opp_hands, out=best_opponent)
+                if nested or i == num_opponents - 1:
+                    wins[i] += int(np.count_nonzero(your_hands > best_opponent))
+                    ties[i] += int(np.count_nonzero(your_hands == best_opponent))
+            done += n
+
+        return _tally_result(
+            [(w, t, simulations - w - t) for w, t in zip(wins, ties)], nested
+        )
+
+    def _simulate_python_ranges(self, hole_cards, community_cards, available_cards, ranges,
+                                simulations, seed=None, nested=False):
+        """
+        Run trials against weighted opponent ranges, one at a time. Opponent
+        hands are drawn first, from their ranges, rejecting combos that hit
+        a known or already dealt card; the board is then completed from the
+        cards that are left. Returns: (wins, ties, losses), or a list of them
+        per opponent count with `nested`
+        """
+        rng = self.rng_factory(seed)
+        evaluate = HandEvaluator.evaluate_strength_batch
+        hole = [c.index for c in hole_cards]
+        board = [c.index for c in community_cards]
+        stub = [c.index for c in available_cards]
+        known = ((1 << 52) - 1) & ~cards_mask(available_cards)
+        n = len(stub)
+        tallies = [[0, 0, 0] for _ in ranges]
+        last = len(ranges) - 1
+
+        for _ in range(simulations):
+            blocked = known
+            opponent_hands = []
+            for hand_range in ranges:
+                a, b = hand_range.sample(rng, blocked)
+                blocked |= (1 << a) | (1 << b)
+                opponent_hands.append([a, b])
+
+            simulated_board = list(board)
+            while len(simulated_board) < 5:
+                c = stub[int(rng.random() * n)]
+                if not blocked >> c & 1:
+                    blocked |= 1 << c
+                    simulated_board.append(c)
 
+            your_hand, *strengths = evaluate(simulated_board, [hole] + opponent_hands)
+            best_opponent = 0
+            for i, strength in enumerate(strengths):
+                if strength > best_opponent:
+                    best_opponent = strength
+                if nested or i == last:
+                    _tally(tallies[i], your_hand, best_opponent)
+
+        return _tally_result(tallies, nested)
+
+    def _simulate_numpy_ranges(self, hole_cards, community_cards, available_cards, ranges,
+                               simulations, seed=None, nested=False):
+        """
+        Batched trials against weighted opponent ranges. Each row draws its
+        opponent combos with the ranges' alias tables, swaps those cards to
+        the front of its deck, then deals the board from the rest with a
+        partial Fisher-Yates shuffle. Returns: (wins, ties, losses), or a
+        list of them per opponent count with `nested`
+        """
+        rng = np.random.default_rng(seed)
+        combo_cards, combo_masks = combo_arrays()
+
+        hole = np.array([card_to_index(c) for c in hole_cards])
+        board = np.array([card_to_index(c) for c in community_cards], dtype=np.intp)
+        stub = np.array([card_to_index(c) for c in available_cards])
+        known = ((1 << 52) - 1) & ~cards_mask(available_cards)
+
+        # Position of every card in a fresh deck row (-1 = not in the stub)
+        positions = np.full(52, -1, dtype=np.intp)
+        positions[stub] = np.arange(len(stub))
+
+        cards_to_deal = 5 - len(community_cards)
+        dealt = 2 * len(ranges)
+
+        wins = [0] * len(ranges)
+        ties = [0] * len(ranges)
+        done = 0
+
+        while done < simulations:
+            n = min(self.batch_size, simulations - done)
+            rows = np.arange(n)
+            decks = np.tile(stub, (n, 1))
+            where = np.tile(positions, (n, 1))
+            blocked = np.full(n, known, dtype=np.int64)
+
+            # Swap each opponent card into the next front slot of its row
+            slot = 0
+            for hand_range in ranges:
+                combos = hand_range.sample_array(rng, blocked)
+                blocked |= combo_masks[combos]
+                for card in combo_cards[combos].T:
+                    j = where[rows, card]
+                    displaced = decks[:, slot]
+                    decks[rows, j] = displaced
+                    where[rows, displaced] = j
+                    decks[:, slot] = card
+                    where[rows, card] = slot
+                    slot += 1
+
+            deal_rows(decks, dealt, dealt + cards_to_deal, rng)
+
+            boards = np.concatenate(
+                [np.broadcast_to(board, (n, len(board))), decks[:, dealt:dealt + cards_to_deal]],
+                axis=1
+            )
+            your_hands = HandEvaluator.evaluate_strength_array(
+                np.concatenate([np.broadcast_to(hole, (n, 2)), boards], axis=1)
+            )
+
+            best_opponent = np.zeros(n, dtype=your_hands.dtype)
+            for i in range(len(ranges)):
+                opp_hands = HandEvaluator.evaluate_strength_array(
+                    np.concatenate([decks[:, 2 * i:2 * i + 2], boards], axis=1)
+                )
+                np.maximum(best_opponent, opp_hands, out=best_opponent)
+                if nested or i == len(ranges) - 1:
+                    wins[i] += int(np.count_nonzero(your_hands > best_opponent))
+                    ties[i] += int(np.count_nonzero(your_hands == best_opponent))
+            done += n
+
+        return _tally_result(
+            [(w, t, simulations - w - t) for w, t in zip(wins, ties)], nested
+        )
+
+    def _build_result(self, wins, ties, losses, hole_cards, community_cards, method='monte_carlo',
+                      ranges=None):
+        """Turn win/tie/loss counts into the result dictionary"""
         # Calculate percentages
-        total = self.simulations
+        total = wins + ties + losses
         win_pct = (wins / total) * 100
         tie_pct = (ties / total) * 100
         lose_pct = (losses / total) * 100
 
         # Evaluate current hand (with current board)
-        current_hand_name, current_rank, _ = HandEvaluator.evaluate_hand(hole_cards, community_cards)
+        current_hand_name = HandEvaluator.strength_name(
+            HandEvaluator.evaluate_strength(hole_cards, community_cards)
+        )
 
-        return {
+        result = {
             'win_pct': round(win_pct, 1),
             'tie_pct': round(tie_pct, 1),
             'lose_pct': round(lose_pct, 1),
             'equity': round(win_pct + tie_pct/2, 1),  # Equity = win% + tie%/2
             'current_hand': current_hand_name,
-            'hand_strength': HandEvaluator.hand_strength_category(current_hand_name)
+            'hand_strength': HandEvaluator.hand_strength_category(current_hand_name),
+            'method': method,
+            'simulations': total,
+            # Standard error of the equity estimate, in percentage points
+            'std_error': 0.0 if method == 'exact' else round(_std_error(wins / total, ties / total, total), 2)
         }
+        if ranges:
+            # Equity already reflects the opponents' ranges
+            result['vs_range'] = True
+        return result
 
     def _compare_hands(self, your_hand, opponent_hands):
         """
         Compare your hand against opponent hands
+        your_hand / opponent_hands: strengths from HandEvaluator.evaluate_strength
         Returns: 'win', 'tie', or 'lose'
         """
-        your_rank, your_tiebreakers = your_hand[1], your_hand[2]
-
-        better_hands = 0
-        tied_hands = 0
-
-        for opp_hand in opponent_hands:
-            opp_rank, opp_tiebreakers = opp_hand[1], opp_hand[2]
+        best_opponent = max(opponent_hands) if opponent_hands else 0
 
-            if opp_rank > your_rank:
-                better_hands += 1
-            elif opp_rank == your_rank:
-                # Compare tiebreakers
-                if opp_tiebreakers > your_tiebreakers:
-                    better_hands += 1
-                elif opp_tiebreakers == your_tiebreakers:
-                    tied_hands += 1
-
-        if better_hands > 0:
+        if best_opponent > your_hand:
             return 'lose'
-        elif tied_hands > 0:
+        elif best_opponent == your_hand:
             return 'tie'
         else:
             return 'win'
 
-    def quick_equity(self, hole_cards, community_cards, num_opponents, simulations=500):
-        """Faster equity calculation with fewer simulations (for real-time updates)"""
+    def quick_equity(self, hole_cards, community_cards, num_opponents, simulations=500,
+                     time_budget_ms=None, dead_cards=None, opponent_range=None):
+        """
+        Faster equity calculation with fewer simulations (for real-time updates)
+        With time_budget_ms, runs as many trials as fit in that many milliseconds instead
+        """
+        if time_budget_ms is not None:
+            return self.calculate_equity_timed(
+                hole_cards, community_cards, num_opponents, time_budget_ms, dead_cards=dead_cards,
+                opponent_range=opponent_range
+            )
+
         old_sims = self.simulations
         self.simulations = simulations
-        result = self.calculate_equity(hole_cards, community_cards, num_opponents)
+        result = self.calculate_equity(hole_cards, community_cards, num_opponents, dead_cards,
+                                       opponent_range)
         self.simulations = old_sims
         return result
+
+    async def calculate_equity_async(self, hole_cards, community_cards, num_opponents,
+                                     dead_cards=None, opponent_range=None, progress=None,
+                                     chunk_size=None, executor=None):
+        """
+        Awaitable calculate_equity: self.simulations trials, run a chunk at a
+        time off the event loop
+
+        Between chunks control returns to the loop, so many analyses can
+        share it. Cancelling the awaiting task stops the simulation after
+        the chunk in progress; nothing is computed for it afterwards.
+
+        Args:
+            progress: Optional callable given each partial result (the
+                      iter_equity dictionaries) as chunks finish, on the
+                      event loop
+            chunk_size: Fixed trials per chunk instead of the doubling
+                        schedule (smaller chunks cancel sooner)
+            executor: concurrent.futures executor the chunks run on (default:
+                      one thread per calculator, so concurrent calls take
+                      turns chunk by chunk)
+
+        Returns:
+            The final result dictionary
+        """
+        stream = self.iter_equity(hole_cards, community_cards, num_opponents,
+                                  simulations=self.simulations, chunk_size=chunk_size,
+                                  dead_cards=dead_cards, opponent_range=opponent_range)
+        return await self._drive_async(stream, progress, executor)
+
+    async def quick_equity_async(self, hole_cards, community_cards, num_opponents,
+                                 simulations=500, time_budget_ms=None, dead_cards=None,
+                                 opponent_range=None, progress=None, executor=None):
+        """
+        Awaitable quick_equity: `simulations` trials, or as many as fit in
+        time_budget_ms, with the cancellation and progress of
+        calculate_equity_async
+        """
+        stream = self.iter_equity(hole_cards, community_cards, num_opponents,
+                                  simulations=None if time_budget_ms is not None else simulations,
+                                  time_budget_ms=time_budget_ms, dead_cards=dead_cards,
+                                  opponent_range=opponent_range)
+        return await self._drive_async(stream, progress, executor)
+
+    async def _drive_async(self, stream, progress, executor):
+        """Advance a result stream one chunk per executor call until it ends"""
+        # Imported here: only async callers need them
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        if executor is None:
+            if self._async_executor is None:
+                self._async_executor = ThreadPoolExecutor(max_workers=1)
+            executor = self._async_executor
+
+        result = None
+        while True:
+            future = executor.submit(next, stream, None)
+            try:
+                partial = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # The chunk may still be running on the executor; close the
+                # stream once it is done so no further chunks run
+                future.add_done_callback(lambda _: stream.close())
+                raise
+            if partial is None:
+                return result
+            result = partial
+            if progress is not None:
+                progress(result)
+
+
+def _opponent_ranges(opponent_range, num_opponents):
+    """Normalize an opponent_range argument to a tuple with one HandRange per opponent, or None"""
+    if opponent_range is None:
+        return None
+    if isinstance(opponent_range, HandRange):
+        return (opponent_range,) * num_opponents
+    ranges = tuple(opponent_range)
+    if len(ranges) != num_opponents:
+        raise ValueError(f"Expected {num_opponents} opponent ranges, got {len(ranges)}")
+    return ranges
+
+
+def _sampled_ranges(ranges):
+    """
+    The ranges if they change how opponents' hands are dealt, or None when
+    every opponent plays every hand equally (a random opponent), so the
+    preflop table and exact enumeration still apply. Results keep their
+    'vs_range' flag either way.
+    """
+    if ranges and not all(r.is_uniform() for r in ranges):
+        return ranges
+    return None
+
+
+def _tally(tally, your_hand, best_opponent):
+    """Count one trial into a [wins, ties, losses] list"""
+    if your_hand > best_opponent:
+        tally[0] += 1
+    elif your_hand == best_opponent:
+        tally[1] += 1
+    else:
+        tally[2] += 1
+
+
+def _tally_result(tallies, nested):
+    """Per-opponent-count tallies as returned by the trial loops"""
+    if nested:
+        return [tuple(tally) for tally in tallies]
+    return tuple(tallies[-1])
+
+
+def _count_holding_sets(cards, num_opponents):
+    """Number of ways to give num_opponents players 2 cards each from `cards` cards"""
+    if 2 * num_opponents > cards:
+        return 0
+    ordered = factorial(cards) // factorial(cards - 2 * num_opponents) // 2 ** num_opponents
+    return ordered // factorial(num_opponents)
+
+
+def _stratified_trials(runouts, simulations):
+    """Trials a stratified run makes: the same whole number for every runout"""
+    return max(1, simulations // runouts) * runouts
+
+
+def _disjoint(holding_set):
+    """Whether no card appears in more than one (card mask, strength) holding"""
+    seen = 0
+    for mask, _ in holding_set:
+        if seen & mask:
+            return False
+        seen |= mask
+    return True
+
+
+def _worker_init():
+    """Build the evaluator tables once per worker process"""
+    HandEvaluator.evaluate_strength(create_deck()[:5], [])
+
+
+def _worker_trials(task):
+    """Run one chunk of trials in a worker process (cards travel as indices)"""
+    (backend, batch_size, rng_factory, hole, board, stub, num_opponents,
+     simulations, runouts, offset, seed, ranges) = task
+
+    def to_cards(indices):
+        return [index_to_card(i) for i in indices]
+
+    calc = EquityCalculator(backend=backend, batch_size=batch_size, rng_factory=rng_factory)
+    return calc._run_trials(
+        to_cards(hole), to_cards(board), to_cards(stub), num_opponents, simulations,
+        [to_cards(r) for r in runouts] if runouts is not None else None, offset, seed, ranges,
+        nested=True
+    )
+
+
+def _std_error(win_rate, tie_rate, trials):
+    """
+    Standard error of an equity estimate in percentage points. Each trial
+    scores 1 for a win, 1/2 for a tie and 0 for a loss.
+    """
+    if trials <= 0:
+        return float('inf')
+    equity = win_rate + tie_rate / 2
+    variance = win_rate + tie_rate / 4 - equity * equity
+    return 100 * sqrt(max(variance, 0.0) / trials)
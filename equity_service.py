@@ -0,0 +1,264 @@
+"""
+Equity Service
+Local asyncio JSON service sharing one warm EquityCalculator between
+clients (study tools, the app through a local bridge, batch jobs)
+
+    python equity_service.py --port 8765
+
+Endpoints (HTTP/1.1, JSON bodies, localhost only by default):
+
+    POST /equity     {"hole": "AhKd", "board": "Qs7h2c", "opponents": 2}
+    POST /recommend  same fields plus position, facing_bet, aggression
+    GET  /stats      per-endpoint latency and coalescing counters
+    GET  /health
+
+Spot fields are those of batch_analysis.py; "tightness" draws the opponents
+from that range (omit it for random opponents) and "simulations" overrides
+the service default, up to MAX_SIMULATIONS. Identical requests that arrive
+while one is in flight share its result. Other requests go straight to the
+calculator thread's queue, with no batching window, and each answer goes
+out as soon as its own job finishes.
+"""
+
+import asyncio
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_analysis import STREETS, parse_cards
+from equity_calculator import EquityCalculator
+from hand_range import HandRange
+from strategy_engine import StrategyEngine
+from timing import latency_stats
+
+DEFAULT_PORT = 8765
+
+# Latencies kept per endpoint for the stats
+LATENCY_WINDOW = 10000
+
+# Endpoints with their own stats; anything else is counted under 'other'
+ENDPOINTS = ('/equity', '/recommend', '/stats', '/health')
+
+# Most trials one request may ask for; the calculator thread is shared
+MAX_SIMULATIONS = 200000
+
+_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class EquityService:
+    """
+    calculate_equity and get_recommendation behind an asyncio front end
+
+    Equity jobs run in arrival order on one calculator thread, so
+    concurrent clients share the warm tables, pool and cache instead of
+    contending for them. A job is submitted the moment its request is
+    parsed and answered as soon as it finishes; identical requests in
+    flight wait on the same job.
+    """
+
+    def __init__(self, equity_calc=None, simulations=2000):
+        """
+        equity_calc: Shared EquityCalculator (default: one with a 4096-entry
+                     cache)
+        simulations: Trials per request unless the request sets its own
+        """
+        self.equity_calc = equity_calc or EquityCalculator(simulations=simulations,
+                                                           cache_size=4096)
+        self.simulations = simulations
+
+        self._inflight = {}       # request key -> asyncio.Future
+        self._ranges = {}         # tightness -> HandRange
+        # The calculator isn't thread-safe; all equity runs on this one thread
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._latencies = {}      # endpoint -> deque of seconds
+        self._errors = {}         # endpoint -> count
+        self.counters = {'requests': 0, 'coalesced': 0, 'jobs': 0}
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Warm up the calculator and start listening; returns the asyncio server"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.equity_calc.warm_up)
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def equity(self, request):
+        """Equity result for a spot request (coalesced with identical in-flight ones)"""
+        job = self._parse(request)
+        key = job['key']
+        self.counters['requests'] += 1
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counters['coalesced'] += 1
+            return dict(await asyncio.shield(future))
+
+        self.counters['jobs'] += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._run_job, job)
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded: a client that gives up doesn't cancel the shared result
+        return dict(await asyncio.shield(future))
+
+    async def recommend(self, request):
+        """Equity plus the recommendation for the spot's position and tendencies"""
+        equity = await self.equity(request)
+        strategy = StrategyEngine()
+        strategy.update_opponent_tendencies(float(request.get('tightness', 0.5)),
+                                            float(request.get('aggression', 0.5)))
+        board = parse_cards(request.get('board'))
+        rec = strategy.get_recommendation(
+            dict(equity), request.get('position', 'BTN'), int(request.get('opponents', 3)),
+            STREETS[len(board)], bool(request.get('facing_bet', False))
+        )
+        return {'equity': equity, 'recommendation': rec}
+
+    def stats(self):
+        """Per-endpoint latency (ms), error counts and the coalescing counters"""
+        endpoints = {}
+        for endpoint, seconds in self._latencies.items():
+            endpoints[endpoint] = latency_stats(list(seconds))
+            endpoints[endpoint]['requests'] = len(seconds)
+            endpoints[endpoint]['errors'] = self._errors.get(endpoint, 0)
+        stats = {'endpoints': endpoints, 'counters': dict(self.counters), 'inflight': len(self._inflight)}
+        if self.equity_calc.cache is not None:
+            stats['cache'] = self.equity_calc.cache.stats()
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.equity_calc.close()
+
+    def _parse(self, request):
+        """Validate a spot request into an equity job"""
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        hole = parse_cards(request.get('hole'))
+        board = parse_cards(request.get('board'))
+        dead = parse_cards(request.get('dead'))
+        if len(hole) != 2:
+            raise ValueError("Must have exactly 2 hole cards")
+        if len(board) not in STREETS:
+            raise ValueError(f"Board must have 0, 3, 4 or 5 cards, got {len(board)}")
+        known = hole + board + dead
+        if len(set(known)) != len(known):
+            raise ValueError("Duplicate cards")
+        num_opponents = int(request.get('opponents', 3))
+        if not 1 <= num_opponents <= 9:
+            raise ValueError("opponents must be 1-9")
+        simulations = int(request.get('simulations', self.simulations))
+        if not 1 <= simulations <= MAX_SIMULATIONS:
+            raise ValueError(f"simulations must be 1-{MAX_SIMULATIONS}")
+        tightness = request.get('tightness')
+        tightness = None if tightness is None else round(float(tightness), 3)
+
+        key = (tuple(hole), tuple(board), tuple(sorted(dead, key=lambda c: c.index)),
+               num_opponents, tightness, simulations)
+        return {'key': key, 'hole': hole, 'board': board, 'dead': dead or None,
+                'opponents': num_opponents, 'tightness': tightness, 'simulations': simulations}
+
+    def _run_job(self, job):
+        """Equity for one job, on the calculator thread"""
+        opponent_range = None
+        if job['tightness'] is not None:
+            opponent_range = self._ranges.get(job['tightness'])
+            if opponent_range is None:
+                opponent_range = HandRange.from_tightness(job['tightness'])
+                self._ranges[job['tightness']] = opponent_range
+        return self.equity_calc.quick_equity(
+            job['hole'], job['board'], job['opponents'], simulations=job['simulations'],
+            dead_cards=job['dead'], opponent_range=opponent_range
+        )
+
+    async def _handle(self, reader, writer):
+        """Serve one HTTP request per connection"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        endpoint = None
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                raise ValueError("Malformed request")
+            method, path = request_line[0], request_line[1]
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            endpoint = path if path in ENDPOINTS else 'other'
+            status, payload = await self._dispatch(method, path, body)
+        except Exception as e:
+            status, payload = 400, {'error': str(e)}
+
+        if endpoint is not None:
+            self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(
+                loop.time() - start
+            )
+            if status != 200:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS[status]}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        """(status, payload) for a request"""
+        routes = {'/equity': self.equity, '/recommend': self.recommend}
+        if path in ('/stats', '/health'):
+            if method != 'GET':
+                return 405, {'error': f"{path} takes GET"}
+            return 200, self.stats() if path == '/stats' else {'ok': True}
+        if path not in routes:
+            return 404, {'error': f"Unknown endpoint {path}"}
+        if method != 'POST':
+            return 405, {'error': f"{path} takes POST"}
+        try:
+            request = json.loads(body or b'{}')
+            return 200, await routes[path](request)
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, **options):
+    """Run the service until cancelled"""
+    service = EquityService(**options)
+    server = await service.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve equity and recommendations on localhost')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--simulations', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    parser.add_argument('--cache-path', help='Persist results to this cache file')
+    args = parser.parse_args()
+
+    calc = EquityCalculator(simulations=args.simulations, workers=args.workers,
+                            cache_size=args.cache_size, cache_path=args.cache_path)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port, equity_calc=calc, simulations=args.simulations))
+    except KeyboardInterrupt:
+        pass
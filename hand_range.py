@@ -0,0 +1,245 @@
+"""
+Hand Ranges
+Weighted opponent ranges over the 1326 two-card combos, sampled with alias
+tables
+"""
+
+import hashlib
+from itertools import combinations
+
+import preflop_equity
+from poker_evaluator import Card, card_to_index, index_to_card
+
+try:
+    import numpy as np
+except ImportError:  # ranges still sample one trial at a time
+    np = None
+
+# Every two-card combo as a pair of card indices, and its 52-bit card mask
+COMBOS = list(combinations(range(52), 2))
+COMBO_MASKS = [(1 << a) | (1 << b) for a, b in COMBOS]
+
+# Share of combos an opponent plays at tightness 0 (loose) and 1 (tight)
+LOOSEST_FRACTION = 1.0
+TIGHTEST_FRACTION = 0.15
+
+# Consecutive rejected draws before a range is declared incompatible with
+# the known cards
+MAX_REJECTIONS = 1000
+
+_combo_arrays = None
+
+
+def _combo_class(combo):
+    """Starting-hand class of a combo, e.g. 'AKs'"""
+    return preflop_equity.hand_class([index_to_card(i) for i in combo])
+
+
+_COMBO_CLASSES = [_combo_class(combo) for combo in COMBOS]
+
+
+class HandRange:
+    """
+    Weighted range of starting hands for one opponent
+
+    Weights are set per starting-hand class (AA, AKs, AKo, ...) and apply
+    to every combo of that class, so ranges are symmetric under suit
+    relabelling. Sampling uses Walker's alias method: O(1) per draw, with
+    card removal handled by rejecting combos that hit known cards.
+    """
+
+    def __init__(self, class_weights):
+        """
+        class_weights: Dict of hand class -> weight (0.0-1.0); classes that
+                       are missing have weight 0
+        """
+        unknown = set(class_weights) - set(preflop_equity.all_hand_classes())
+        if unknown:
+            raise ValueError(f"Unknown hand classes: {sorted(unknown)}")
+
+        self.class_weights = {name: float(w) for name, w in class_weights.items() if w > 0}
+        if not self.class_weights:
+            raise ValueError("Range must contain at least one hand")
+
+        self.weights = [self.class_weights.get(name, 0.0) for name in _COMBO_CLASSES]
+        self.fingerprint = hashlib.blake2b(
+            repr(sorted(self.class_weights.items())).encode(), digest_size=8
+        ).hexdigest()
+        self._alias = None
+        self._alias_arrays = None
+
+    @classmethod
+    def from_string(cls, text):
+        """Parse a range like 'AA, KK, AKs, AQo:0.5' (weights default to 1)"""
+        weights = {}
+        for part in text.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            name, _, weight = part.partition(':')
+            weights[name.strip()] = float(weight) if weight else 1.0
+        return cls(weights)
+
+    @classmethod
+    def from_tightness(cls, tightness):
+        """
+        Range for an opponent of the given tightness: 0.0 (loose) plays
+        every hand, 1.0 (tight) only the strongest 15% of combos. Hands are
+        ranked by heads-up preflop equity; the class on the boundary gets
+        a partial weight.
+        """
+        tightness = max(0.0, min(1.0, tightness))
+        fraction = LOOSEST_FRACTION - (LOOSEST_FRACTION - TIGHTEST_FRACTION) * tightness
+        remaining = fraction * len(COMBOS)
+
+        weights = {}
+        for name in _ranked_classes():
+            if remaining <= 0:
+                break
+            combos = _class_combo_count(name)
+            weights[name] = min(1.0, remaining / combos)
+            remaining -= combos
+        return cls(weights)
+
+    @classmethod
+    def uniform(cls):
+        """Every hand equally likely (a random opponent)"""
+        return cls({name: 1.0 for name in preflop_equity.all_hand_classes()})
+
+    def is_uniform(self):
+        """Whether every hand is equally likely, i.e. the range is a random opponent"""
+        return (len(self.class_weights) == len(preflop_equity.all_hand_classes()) and
+                len(set(self.class_weights.values())) == 1)
+
+    def combo_fraction(self):
+        """Weighted share of all 1326 combos in the range"""
+        return sum(self.weights) / len(COMBOS)
+
+    def alias_table(self):
+        """(probabilities, aliases) for Walker's alias method, built on first use"""
+        if self._alias is None:
+            self._alias = _build_alias(self.weights)
+        return self._alias
+
+    def sample(self, rng, blocked):
+        """
+        Draw a combo that shares no card with the `blocked` card mask
+
+        Args:
+            rng: random.Random instance
+            blocked: 52-bit mask of cards already out of the deck
+
+        Returns:
+            (card_index, card_index) pair
+        """
+        prob, alias = self.alias_table()
+        n = len(prob)
+        for _ in range(MAX_REJECTIONS):
+            i = int(rng.random() * n)
+            if rng.random() >= prob[i]:
+                i = alias[i]
+            if not COMBO_MASKS[i] & blocked:
+                return COMBOS[i]
+        raise ValueError("No hand in the range is compatible with the known cards")
+
+    def sample_array(self, rng, blocked):
+        """
+        Draw one combo per row, each sharing no card with that row's mask
+
+        Args:
+            rng: numpy Generator
+            blocked: int64 array of 52-bit masks, one per row
+
+        Returns:
+            Array of combo indices into COMBOS
+        """
+        if self._alias_arrays is None:
+            prob, alias = self.alias_table()
+            self._alias_arrays = (np.array(prob), np.array(alias, dtype=np.intp))
+        prob, alias = self._alias_arrays
+        _, masks = combo_arrays()
+
+        picked = np.empty(len(blocked), dtype=np.intp)
+        pending = np.arange(len(blocked))
+        for _ in range(MAX_REJECTIONS):
+            i = rng.integers(0, len(prob), size=len(pending))
+            i = np.where(rng.random(len(pending)) < prob[i], i, alias[i])
+            ok = (masks[i] & blocked[pending]) == 0
+            picked[pending[ok]] = i[ok]
+            pending = pending[~ok]
+            if not len(pending):
+                return picked
+        raise ValueError("No hand in the range is compatible with the known cards")
+
+    def __getstate__(self):
+        # The numpy alias arrays are rebuilt on demand after unpickling
+        state = dict(self.__dict__)
+        state['_alias_arrays'] = None
+        return state
+
+    def __repr__(self):
+        return f"HandRange({self.combo_fraction():.0%} of combos)"
+
+
+def _build_alias(weights):
+    """Vose's alias method over a list of non-negative weights"""
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    prob = [0.0] * n
+    alias = list(range(n))
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+def _class_combo_count(name):
+    """Combos in a hand class: 6 for pairs, 4 suited, 12 offsuit"""
+    if len(name) == 2:
+        return 6
+    return 4 if name[2] == 's' else 12
+
+
+def _ranked_classes():
+    """Hand classes from strongest to weakest by heads-up preflop equity"""
+    table = preflop_equity.load_table()
+    classes = preflop_equity.all_hand_classes()
+    if table is not None:
+        def score(name):
+            win, tie = table['equities'][name][0]
+            return win + tie / 2
+    else:
+        # Rough ordering when the table hasn't been built
+        def score(name):
+            hi, lo = Card.RANKS.index(name[0]), Card.RANKS.index(name[1])
+            if hi == lo:
+                return 50 + 3 * hi
+            return 2 * hi + lo + (3 if name[2] == 's' else 0) - max(0, hi - lo - 4)
+    return sorted(classes, key=score, reverse=True)
+
+
+def combo_arrays():
+    """COMBOS as an (1326, 2) card-index array plus their int64 card masks"""
+    global _combo_arrays
+    if _combo_arrays is None:
+        _combo_arrays = (np.array(COMBOS, dtype=np.intp), np.array(COMBO_MASKS, dtype=np.int64))
+    return _combo_arrays
+
+
+def cards_mask(cards):
+    """52-bit mask of Card objects"""
+    mask = 0
+    for c in cards:
+        mask |= 1 << card_to_index(c)
+    return mask
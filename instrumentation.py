@@ -0,0 +1,221 @@
+"""
+Instrumentation
+Optional call counters and timers on the evaluator, calculator, strategy
+and app hot paths
+
+Nothing is wrapped until enable() is called: the instrumented methods are
+swapped for timing wrappers on the classes themselves and swapped back by
+disable(), so a disabled build runs the original functions with no extra
+cost at all.
+
+    import instrumentation
+    instrumentation.enable()
+    ...
+    print(instrumentation.snapshot())
+    instrumentation.dump('profile.json')
+
+Setting POKER_INSTRUMENT=1 in the environment makes the app enable it at
+startup.
+"""
+
+import importlib
+import inspect
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+ENV_FLAG = 'POKER_INSTRUMENT'
+
+_lock = threading.Lock()
+_timers = {}      # name -> [calls, total seconds, max seconds]
+_counters = {}    # name -> count
+_patched = []     # (owner, attribute, original) to restore on disable()
+_started = None
+
+
+def _record_simulations(args, kwargs, result):
+    # Trials actually run: (wins, ties, losses), or one tally per opponent count
+    tally = result[-1] if isinstance(result, list) else result
+    count('equity.simulations', sum(tally))
+
+
+def _record_method(args, kwargs, result):
+    count(f"equity.method.{result.get('method', 'unknown')}")
+
+
+def _record_cache(args, kwargs, result):
+    count('cache.misses' if result is None else 'cache.hits')
+
+
+# (module, class, method, timer name, optional recorder of each result)
+# The simulations and exact enumeration score hands in batches, so the
+# evaluator is timed at its batch entry points rather than per hand
+TARGETS = [
+    ('poker_evaluator', 'HandEvaluator', 'evaluate_strength', 'evaluator.evaluate_strength', None),
+    ('poker_evaluator', 'HandEvaluator', 'evaluate_strength_batch',
+     'evaluator.evaluate_strength_batch', None),
+    ('poker_evaluator', 'HandEvaluator', 'evaluate_strength_array',
+     'evaluator.evaluate_strength_array', None),
+    ('equity_calculator', 'EquityCalculator', 'calculate_equity', 'equity.calculate_equity',
+     _record_method),
+    ('equity_calculator', 'EquityCalculator', 'iter_equity_by_opponents',
+     'equity.iter_equity_by_opponents', None),
+    ('equity_calculator', 'EquityCalculator', '_simulate', 'equity.simulate', _record_simulations),
+    ('equity_calculator', 'EquityCalculator', '_simulate_numpy', 'equity.simulate_numpy', None),
+    ('equity_calculator', 'EquityCalculator', '_simulate_python', 'equity.simulate_python', None),
+    ('equity_calculator', 'EquityCalculator', '_enumerate', 'equity.enumerate', None),
+    ('equity_cache', 'EquityCache', 'get', 'cache.get', _record_cache),
+    ('strategy_engine', 'StrategyEngine', 'get_recommendation', 'strategy.get_recommendation',
+     None),
+]
+
+
+def is_enabled():
+    """Whether the hot paths are currently instrumented"""
+    return bool(_patched)
+
+
+def enable(extra=()):
+    """
+    Wrap every target in TARGETS. Calling it twice is harmless.
+
+    Args:
+        extra: More (class, method, timer name) triples to wrap, for classes
+               that aren't importable by module name (e.g. the app, which
+               runs as __main__)
+    """
+    global _started
+    if _patched:
+        return
+    targets = [
+        (getattr(importlib.import_module(module_name), class_name), attribute, name, recorder)
+        for module_name, class_name, attribute, name, recorder in TARGETS
+    ]
+    targets += [(owner, attribute, name, None) for owner, attribute, name in extra]
+    for owner, attribute, name, recorder in targets:
+        original = inspect.getattr_static(owner, attribute)
+        setattr(owner, attribute, _wrap(original, name, recorder))
+        _patched.append((owner, attribute, original))
+    if _started is None:
+        _started = time.perf_counter()
+
+
+def disable():
+    """Restore the original methods; collected numbers are kept"""
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+
+
+def reset():
+    """Zero every counter and timer"""
+    global _started
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _started = time.perf_counter() if _patched else None
+
+
+def count(name, n=1):
+    """Add n to a named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def add_time(name, seconds):
+    """Record one call of `seconds` under a named timer"""
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+        if seconds > timer[2]:
+            timer[2] = seconds
+
+
+def snapshot():
+    """
+    Current numbers as a JSON-serializable dictionary: per-timer calls,
+    total/mean/max time, raw counters, and derived simulation throughput
+    and cache hit rate
+    """
+    with _lock:
+        timers = {
+            name: {
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'mean_us': round(total / calls * 1e6, 2),
+                'max_ms': round(longest * 1000, 3),
+            }
+            for name, (calls, total, longest) in sorted(_timers.items())
+        }
+        counters = dict(sorted(_counters.items()))
+        simulate = tuple(_timers.get('equity.simulate', ()))
+
+    derived = {}
+    if simulate and simulate[1]:
+        derived['sims_per_sec'] = round(counters.get('equity.simulations', 0) / simulate[1])
+    lookups = counters.get('cache.hits', 0) + counters.get('cache.misses', 0)
+    if lookups:
+        derived['cache_hit_rate'] = round(counters.get('cache.hits', 0) / lookups, 3)
+
+    return {
+        'enabled': is_enabled(),
+        'elapsed_s': round(time.perf_counter() - _started, 3) if _started is not None else 0.0,
+        'timers': timers,
+        'counters': counters,
+        'derived': derived,
+    }
+
+
+def dump(path):
+    """Write snapshot() to a JSON file"""
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=2)
+    return path
+
+
+def enable_from_env(extra=()):
+    """enable() when POKER_INSTRUMENT is set to a non-empty value other than 0"""
+    if os.environ.get(ENV_FLAG, '') not in ('', '0'):
+        enable(extra)
+
+
+def _wrap(original, name, recorder):
+    """A timing wrapper with the same binding (static or plain) as `original`"""
+    static = isinstance(original, staticmethod)
+    func = original.__func__ if static else original
+
+    if inspect.isgeneratorfunction(func):
+        # Time only the work done inside the generator, not the consumer's
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stream = func(*args, **kwargs)
+            elapsed = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        value = next(stream)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield value
+            finally:
+                stream.close()
+                add_time(name, elapsed)
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            add_time(name, time.perf_counter() - start)
+            if recorder is not None:
+                recorder(args, kwargs, result)
+            return result
+
+    return staticmethod(wrapper) if static else wrapper
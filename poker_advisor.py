@@ -3,17 +3,38 @@ Poker Strategy Advisor - Main Application
 Pythonista 3 optimized UI for iPad
 """
 
+import os
+from functools import partial
 import ui
+import instrumentation
 from poker_evaluator import Card, HandEvaluator
+from analysis_pipeline import AnalysisPipeline, AnalysisWorker, Coalescer
 from equity_calculator import EquityCalculator
 from strategy_engine import StrategyEngine
 
 class PokerAdvisorApp:
     """Main application class for Poker Strategy Advisor"""
 
+    # Results persist here between sessions
+    EQUITY_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'equity_cache.bin')
+
+    # Time allowed for each equity update, whatever the number of opponents.
+    # Estimates stream in as they sharpen; the first one shows within a few ms.
+    EQUITY_BUDGET_MS = 600
+
     def __init__(self):
-        self.equity_calc = EquityCalculator(simulations=1000)
+        self.equity_calc = EquityCalculator(simulations=1000, cache_size=512,
+                                            cache_path=self.EQUITY_CACHE_FILE)
         self.strategy = StrategyEngine()
+        self.pipeline = AnalysisPipeline(self.equity_calc, self.strategy,
+                                         time_budget_ms=self.EQUITY_BUDGET_MS)
+        # Equity runs on a background thread; a newer spot cancels an older one
+        self.worker = AnalysisWorker(self.pipeline, self.post_analysis, self.post_error,
+                                     warm_up=True)
+        # Slider drags fire many events; recompute once they settle. The
+        # coalescer fires on a timer thread, so the refresh is posted to
+        # the main thread like the worker's results
+        self.refresh_soon = Coalescer(partial(self.on_main_thread, self.refresh))
 
         # Game state
         self.hole_cards = []
@@ -28,6 +49,11 @@ class PokerAdvisorApp:
         self.main_view = None
         self.build_ui()
 
+        # Build the evaluator tables off the main thread once the views exist:
+        # startup doesn't wait for them, and they are usually ready before
+        # the first hand is entered
+        self.worker.start()
+
     def build_ui(self):
         """Build the main interface"""
         self.main_view = ui.View()
@@ -296,6 +322,18 @@ class PokerAdvisorApp:
 
         y += 85
 
+        # RUNOUTS - equity by next card
+        runouts_btn = ui.Button(frame=(20, y, w-40, 70))
+        runouts_btn.title = '🃏 Next Card Equity'
+        runouts_btn.background_color = '#1e3a5f'
+        runouts_btn.tint_color = 'white'
+        runouts_btn.font = ('<system-bold>', 24)
+        runouts_btn.corner_radius = 12
+        runouts_btn.action = self.show_runouts
+        scroll.add_subview(runouts_btn)
+
+        y += 85
+
         scroll.content_size = (w, y + 20)
 
     def build_card_selector(self, callback):
@@ -478,57 +516,84 @@ class PokerAdvisorApp:
     def analyze(self):
         """Analyze hand and show recommendation"""
         if len(self.hole_cards) != 2:
+            self.worker.cancel()
             self.rec_lbl.text = 'Select 2 hole cards first'
             return
 
-        try:
-            if len(self.community_cards) == 0:
-                # Pre-flop
-                strength = self.strategy.get_preflop_hand_strength(self.hole_cards)
-                self.equity_lbl.text = f"{strength}%"
-
-                equity_data = {
-                    'equity': strength,
-                    'win_pct': strength,
-                    'tie_pct': 0,
-                    'lose_pct': 100 - strength,
-                    'current_hand': 'Hole Cards',
-                    'hand_strength': 'Pre-flop'
-                }
-            else:
-                # Post-flop
-                equity_data = self.equity_calc.quick_equity(
-                    self.hole_cards,
-                    self.community_cards,
-                    self.num_opponents,
-                    simulations=500
-                )
-                self.equity_lbl.text = f"{equity_data['win_pct']}%"
-
-            # Color code equity
-            if equity_data['win_pct'] >= 60:
-                self.equity_lbl.text_color = '#00ff00'
-            elif equity_data['win_pct'] >= 40:
-                self.equity_lbl.text_color = '#ffff00'
-            else:
-                self.equity_lbl.text_color = '#ff6600'
-
-            # Update hand
-            self.hand_lbl.text = equity_data['current_hand']
-
-            # Get recommendation
-            rec = self.strategy.get_recommendation(
-                equity_data,
-                self.position,
-                self.num_opponents,
-                self.street,
-                self.facing_bet
-            )
+        self.worker.submit(self.hole_cards, self.community_cards)
 
-            self.rec_lbl.text = f"⚡ {rec['action']} ⚡"
+    def refresh(self):
+        """
+        Re-run only the strategy stage when equity for the current cards and
+        opponent range is already known; otherwise analyze from scratch
+        """
+        if len(self.hole_cards) != 2:
+            self.analyze()
+            return
 
-        except Exception as e:
-            self.rec_lbl.text = f"Error: {str(e)}"
+        curve = self.pipeline.cached_curve(self.hole_cards, self.community_cards)
+        if curve is not None:
+            self.show_analysis(dict(curve[self.num_opponents]), list(self.community_cards))
+        # Supersedes any stale spot; left running if it is already this
+        # spot, so next-card speculation carries on
+        self.analyze()
+
+    def on_main_thread(self, func, *args):
+        """Run func on the main thread, where ui views may be changed"""
+        ui.delay(partial(func, *args), 0)
+
+    def post_analysis(self, curve, hole_cards, community_cards):
+        """Hand an equity estimate from the worker thread to the main thread"""
+        self.on_main_thread(self.show_estimate, curve, hole_cards, community_cards)
+
+    def post_error(self, error):
+        """Hand a failed analysis from the worker thread to the main thread"""
+        self.on_main_thread(self.show_error, error)
+
+    def show_estimate(self, curve, hole_cards, community_cards):
+        """
+        Show an equity estimate. Equity for 1-3 opponents is computed
+        together, so the current opponent count is picked here. An estimate
+        posted just before the cards changed is dropped rather than painted
+        over the new spot.
+        """
+        if list(hole_cards) != self.hole_cards or list(community_cards) != self.community_cards:
+            return
+        self.show_analysis(dict(curve[self.num_opponents]), community_cards)
+
+    def show_error(self, error):
+        """Show a failed analysis"""
+        self.rec_lbl.text = f"Error: {str(error)}"
+
+    def show_analysis(self, equity_data, community_cards):
+        """Paint an equity estimate and its recommendation"""
+        self.equity_lbl.text = f"{equity_data['win_pct']}%"
+
+        if len(community_cards) == 0:
+            equity_data['current_hand'] = 'Hole Cards'
+            equity_data['hand_strength'] = 'Pre-flop'
+
+        # Color code equity
+        if equity_data['win_pct'] >= 60:
+            self.equity_lbl.text_color = '#00ff00'
+        elif equity_data['win_pct'] >= 40:
+            self.equity_lbl.text_color = '#ffff00'
+        else:
+            self.equity_lbl.text_color = '#ff6600'
+
+        # Update hand
+        self.hand_lbl.text = equity_data['current_hand']
+
+        # Get recommendation
+        rec = self.pipeline.recommend(
+            equity_data,
+            self.position,
+            self.num_opponents,
+            self.street,
+            self.facing_bet
+        )
+
+        self.rec_lbl.text = f"⚡ {rec['action']} ⚡"
 
     def cycle_position(self, sender):
         """Cycle position"""
@@ -536,23 +601,23 @@ class PokerAdvisorApp:
         idx = positions.index(self.position)
         self.position = positions[(idx + 1) % 4]
         self.pos_btn.title = self.position
-        self.analyze()
+        self.refresh()
 
     def adjust_opponents(self, delta):
         """Adjust opponents"""
         self.num_opponents = max(1, min(3, self.num_opponents + delta))
         self.opp_lbl.text = str(self.num_opponents)
-        self.analyze()
+        self.refresh()
 
     def toggle_facing_bet(self, sender):
         """Toggle facing bet"""
         self.facing_bet = sender.value
-        self.analyze()
+        self.refresh()
 
     def toggle_preflop_raise(self, sender):
         """Toggle pre-flop raise"""
         self.preflop_raise = sender.value
-        self.analyze()
+        self.refresh()
 
     def update_opponent_sliders(self, sender):
         """Update opponent tendencies from sliders"""
@@ -560,7 +625,7 @@ class PokerAdvisorApp:
             self.tight_slider.value,
             self.agg_slider.value
         )
-        self.analyze()
+        self.refresh_soon()
 
     def new_hand(self, sender):
         """New hand"""
@@ -570,6 +635,12 @@ class PokerAdvisorApp:
         self.position = positions[(idx + 1) % 4]
         self.pos_btn.title = self.position
 
+        # Stop analyzing the old hand before clearing it, and drop updates
+        # already posted for it
+        self.worker.cancel()
+        self.refresh_soon.cancel()
+        ui.cancel_delays()
+
         # Clear
         self.hole_cards = []
         self.community_cards = []
@@ -589,6 +660,74 @@ class PokerAdvisorApp:
         self.hand_lbl.text = 'Select your cards'
         self.rec_lbl.text = 'Tap the ? buttons above\nto select your cards'
 
+    def show_runouts(self, sender):
+        """Show equity for every possible next card - FULLSCREEN"""
+        n = len(self.community_cards)
+        if len(self.hole_cards) != 2 or not 3 <= n < 5:
+            self.rec_lbl.text = 'Next card equity needs\nthe flop or turn'
+            return
+
+        table = self.pipeline.runout_table(self.hole_cards, self.community_cards)
+        done = [(card, curve[self.num_opponents]['win_pct'])
+                for card, curve in table.items() if curve is not None]
+        done.sort(key=lambda item: item[1], reverse=True)
+
+        suit_symbols = {'h': '♥️', 'd': '♦️', 'c': '♣️', 's': '♠️'}
+        street = 'TURN' if n == 3 else 'RIVER'
+        lines = [f"{card.rank}{suit_symbols[card.suit]}  {pct}%" for card, pct in done]
+        if len(done) < len(table):
+            lines.append(f"... {len(table) - len(done)} cards still computing")
+
+        v = ui.View()
+        v.name = 'Next Card Equity'
+        v.background_color = '#1a472a'
+
+        # FULL SCREEN
+        screen = ui.get_screen_size()
+        w = screen[0]
+        h = screen[1]
+
+        scroll = ui.ScrollView(frame=(0, 0, w, h))
+        scroll.background_color = '#1a472a'
+        v.add_subview(scroll)
+
+        y = 80
+
+        # Title
+        runouts_title = ui.Label(frame=(0, y, w, 60))
+        runouts_title.text = f'🃏 EQUITY BY {street} CARD 🃏'
+        runouts_title.text_color = 'white'
+        runouts_title.font = ('<system-bold>', 36)
+        runouts_title.alignment = ui.ALIGN_CENTER
+        scroll.add_subview(runouts_title)
+
+        y += 80
+
+        runouts_lbl = ui.Label(frame=(40, y, w-80, 40 * len(lines)))
+        runouts_lbl.text = '\n'.join(lines)
+        runouts_lbl.text_color = 'white'
+        runouts_lbl.font = ('<system-bold>', 26)
+        runouts_lbl.alignment = ui.ALIGN_CENTER
+        runouts_lbl.number_of_lines = 0
+        scroll.add_subview(runouts_lbl)
+
+        y += 40 * len(lines) + 20
+
+        # Close button - HUGE
+        close_btn = ui.Button(frame=(w/2-200, y, 400, 80))
+        close_btn.title = '✖ Close'
+        close_btn.background_color = '#8b0000'
+        close_btn.tint_color = 'white'
+        close_btn.font = ('<system-bold>', 32)
+        close_btn.corner_radius = 15
+        close_btn.action = lambda s: v.close()
+        scroll.add_subview(close_btn)
+
+        y += 100
+
+        scroll.content_size = (w, y + 20)
+        v.present('fullscreen')
+
     def show_settings(self, sender):
         """Show settings - FULLSCREEN"""
         v = ui.View()
@@ -644,7 +783,7 @@ class PokerAdvisorApp:
                 tight_slider.value,
                 agg_slider.value
             )
-            self.analyze()
+            self.refresh()
             v.close()
 
         save_btn = ui.Button(frame=(w/2-200, y, 400, 80))
@@ -676,5 +815,7 @@ class PokerAdvisorApp:
 
 
 if __name__ == '__main__':
+    # POKER_INSTRUMENT=1 times the hot paths; see instrumentation.snapshot()
+    instrumentation.enable_from_env(extra=[(PokerAdvisorApp, 'analyze', 'app.analyze')])
     app = PokerAdvisorApp()
     app.run()
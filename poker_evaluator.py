@@ -3,27 +3,70 @@ Poker Hand Evaluator
 Evaluates Texas Hold'em poker hands and calculates hand strength
 """
 
+from bisect import bisect_left
 from collections import Counter
-from itertools import combinations
+from itertools import combinations, combinations_with_replacement
+
+try:
+    import numpy as np
+except ImportError:  # only the vectorized evaluator needs numpy
+    np = None
+
+# Bump when hand values or their ordering change; persisted results keyed
+# to an older version are discarded
+EVALUATOR_VERSION = 1
 
 class Card:
-    """Represents a playing card"""
+    """
+    Represents a playing card
+
+    Cards are interned: Card('A', 'h') always returns the same immutable
+    instance, so building decks and parsing cards allocates nothing. `index`
+    is the card's 0-51 integer encoding (see card_to_index), which is what
+    the evaluator and simulations work with internally.
+    """
     RANKS = '23456789TJQKA'
     SUITS = 'hdcs'  # hearts, diamonds, clubs, spades
 
-    def __init__(self, rank, suit):
-        self.rank = rank.upper()
-        self.suit = suit.lower()
-        self.rank_value = self.RANKS.index(self.rank)
+    __slots__ = ('rank', 'suit', 'rank_value', 'index')
+
+    _interned = {}
+
+    def __new__(cls, rank, suit):
+        key = (rank.upper(), suit.lower())
+        card = cls._interned.get(key)
+        if card is None:
+            rank, suit = key
+            if len(rank) != 1 or rank not in cls.RANKS:
+                raise ValueError(f"Invalid rank: {rank}")
+            if len(suit) != 1 or suit not in cls.SUITS:
+                raise ValueError(f"Invalid suit: {suit}")
+            card = object.__new__(cls)
+            rank_value = cls.RANKS.index(rank)
+            object.__setattr__(card, 'rank', rank)
+            object.__setattr__(card, 'suit', suit)
+            object.__setattr__(card, 'rank_value', rank_value)
+            object.__setattr__(card, 'index', rank_value * 4 + cls.SUITS.index(suit))
+            cls._interned[key] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card objects are immutable")
+
+    def __reduce__(self):
+        # Unpickle to the interned instance
+        return (Card, (self.rank, self.suit))
 
     def __repr__(self):
         return f"{self.rank}{self.suit}"
 
     def __eq__(self, other):
-        return self.rank == other.rank and self.suit == other.suit
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.index == other.index
 
     def __hash__(self):
-        return hash((self.rank, self.suit))
+        return self.index
 
 class HandEvaluator:
     """Evaluates poker hands and determines winner"""
@@ -42,6 +85,22 @@ class HandEvaluator:
         'High Card': 1
     }
 
+    # Hand strengths run from 1 (7-5-4-3-2 high card) to 7462 (royal flush);
+    # 0 means fewer than 5 cards. Each name covers strengths up to its bound.
+    MAX_STRENGTH = 7462
+    STRENGTH_BOUNDS = [
+        (1277, 'High Card'),
+        (4137, 'One Pair'),
+        (4995, 'Two Pair'),
+        (5853, 'Three of a Kind'),
+        (5863, 'Straight'),
+        (7140, 'Flush'),
+        (7296, 'Full House'),
+        (7452, 'Four of a Kind'),
+        (7461, 'Straight Flush'),
+        (7462, 'Royal Flush')
+    ]
+
     @staticmethod
     def evaluate_hand(hole_cards, community_cards):
         """
@@ -53,7 +112,118 @@ class HandEvaluator:
         if len(all_cards) < 5:
             return ('Incomplete Hand', 0, [])
 
-        # Find best 5-card combination
+        if len(all_cards) > 7:
+            # A flush and a full house can coexist beyond 7 cards, which the
+            # lookup tables don't model; fall back to checking every subset
+            return HandEvaluator._evaluate_exhaustive(all_cards)
+
+        if _HAND_CLASSES is None:
+            _build_tables()
+
+        return _hand_tuple(_lookup_value(all_cards))
+
+    @staticmethod
+    def evaluate_strength(hole_cards, community_cards):
+        """
+        Evaluate the best 5-card hand as a single comparable integer
+        Returns: 1 (worst) to 7462 (royal flush), or 0 with fewer than 5 cards
+        """
+        all_cards = hole_cards + community_cards
+
+        if len(all_cards) < 5:
+            return 0
+
+        if _HAND_CLASSES is None:
+            _build_tables()
+
+        if len(all_cards) > 7:
+            _, rank, tiebreakers = HandEvaluator._evaluate_exhaustive(all_cards)
+            return _CLASS_VALUES[(rank, tuple(tiebreakers))]
+
+        return _lookup_value(all_cards)
+
+    @staticmethod
+    def evaluate_strength_indices(cards):
+        """
+        evaluate_strength for 5-7 cards given as card indices (card_to_index),
+        the allocation-free form used by the simulation loops
+        """
+        if _HAND_CLASSES is None:
+            _build_tables()
+        return _lookup_indices(cards)
+
+    @staticmethod
+    def evaluate_strength_batch(board, hands):
+        """
+        evaluate_strength for many hands sharing one board, given as card
+        indices. The board's rank key, suit counts and per-suit rank masks
+        are summed once; each hand then only adds its own cards, so scoring
+        a hero and N opponents costs little more than N+1 table lookups.
+
+        Args:
+            board: Card indices of the shared board
+            hands: Sequence of card index lists (usually hole pairs); each
+                   hand plus the board must make 5-7 cards
+
+        Returns:
+            List of strengths, one per hand
+        """
+        if _HAND_CLASSES is None:
+            _build_tables()
+        return _lookup_batch(board, hands)
+
+    @staticmethod
+    def evaluate_strength_array(cards):
+        """
+        Vectorized evaluate_strength over many hands at once (requires numpy)
+
+        Args:
+            cards: Integer array of shape (..., n), 5 <= n <= 7, holding card
+                   indices from card_to_index
+
+        Returns:
+            Integer array of shape (...) with strengths 1-7462
+        """
+        if np is None:
+            raise ImportError("evaluate_strength_array requires numpy")
+
+        tables = _ARRAY_TABLES or _build_array_tables()
+        cards = np.asarray(cards)
+
+        keys = tables['rank_keys'][cards].sum(axis=-1)
+        suits = tables['suit_keys'][cards].sum(axis=-1)
+        values = tables['unsuited_values'][np.searchsorted(tables['unsuited_keys'], keys)]
+
+        flush = ((suits + _FLUSH_CHECK) & _FLUSH_BITS) != 0
+        if flush.any():
+            flush_cards = cards[flush]
+            flush_suits = suits[flush]
+            suit_counts = np.stack([(flush_suits >> (4 * s)) & 0xF for s in range(4)], axis=-1)
+            flush_suit = np.argmax(suit_counts >= 5, axis=-1)
+            in_suit = (flush_cards & 3) == flush_suit[..., None]
+            masks = np.where(in_suit, tables['rank_bits'][flush_cards], 0).sum(axis=-1)
+            values[flush] = tables['flush_values'][masks]
+
+        return values
+
+    @staticmethod
+    def strength_name(strength):
+        """Hand name for a strength from evaluate_strength (no tables needed)"""
+        if strength <= 0:
+            return 'Incomplete Hand'
+        idx = bisect_left(HandEvaluator.STRENGTH_BOUNDS, (strength,))
+        return HandEvaluator.STRENGTH_BOUNDS[idx][1]
+
+    @staticmethod
+    def strength_to_hand(strength):
+        """Convert a strength back to its (hand_name, hand_rank, tiebreakers) tuple"""
+        if _HAND_CLASSES is None:
+            _build_tables()
+        return _hand_tuple(strength)
+
+    @staticmethod
+    def _evaluate_exhaustive(all_cards):
+        """Reference evaluator: score all 5-card combinations and keep the best"""
         best_hand = None
         best_rank = 0
         best_tiebreakers = []
@@ -79,6 +249,10 @@ class HandEvaluator:
         is_flush = len(set(suits)) == 1
         is_straight = HandEvaluator._is_straight(ranks)
 
+        # A wheel (A-2-3-4-5) plays as a 5-high straight
+        if is_straight and ranks == [12, 3, 2, 1, 0]:
+            ranks = [3, 2, 1, 0, 12]
+
         # Royal Flush
         if is_flush and is_straight and ranks[0] == 12:  # Ace high
             return ('Royal Flush', 10, ranks)
@@ -159,13 +333,312 @@ class HandEvaluator:
             return "VERY WEAK"
 
 
+
+# ---------------------------------------------------------------------------
+# Lookup tables
+#
+# Every 5-card hand falls into one of 7462 equivalence classes. Classes are
+# numbered 1..7462 from worst (7-5-4-3-2 high card) to best (royal flush), so
+# comparing two hands is comparing two integers.
+#
+# A hand of 5-7 cards is scored with two tables:
+#   * flush hands: indexed by the 13-bit rank mask of the flush suit
+#   * all others: keyed by the sum of 5**rank over the cards, which uniquely
+#     identifies the rank multiset (no rank appears more than 4 times)
+# With at most 7 cards a flush rules out quads and full houses, so a hand
+# with five or more cards of one suit is always scored from the flush table.
+# The tables are built on first use.
+# ---------------------------------------------------------------------------
+
+_RANK_KEYS = [5 ** r for r in range(13)]
+# Suit counts are packed into 4-bit fields (one per suit, in Card.SUITS
+# order); adding 3 to a field carries into its high bit exactly when the suit
+# has 5 or more cards
+_FLUSH_CHECK = 0x3333
+_FLUSH_BITS = 0x8888
+
+# Per-card keys indexed by card index (rank * 4 + suit)
+_INDEX_RANK_KEYS = [_RANK_KEYS[i >> 2] for i in range(52)]
+_INDEX_SUIT_KEYS = [1 << (4 * (i & 3)) for i in range(52)]
+
+_HAND_CLASSES = None     # value -> (hand_name, hand_rank, tiebreakers tuple)
+_CLASS_VALUES = None     # (hand_rank, tuple(tiebreakers)) -> value
+_FLUSH_TABLE = None      # flush-suit rank mask -> value
+_UNSUITED_TABLE = None   # rank key -> value
+_ARRAY_TABLES = None     # numpy versions of the tables, indexed by card index
+
+
+def _lookup_value(cards):
+    """Score 5-7 Card objects (tables must be built)"""
+    return _lookup_indices([c.index for c in cards])
+
+
+def _lookup_indices(cards):
+    """Score 5-7 card indices (tables must be built)"""
+    key = 0
+    suits = 0
+    for i in cards:
+        key += _INDEX_RANK_KEYS[i]
+        suits += _INDEX_SUIT_KEYS[i]
+
+    if (suits + _FLUSH_CHECK) & _FLUSH_BITS:
+        return _FLUSH_TABLE[_flush_mask(cards, suits)]
+
+    return _UNSUITED_TABLE[key]
+
+
+def _lookup_batch(board, hands):
+    """Score hands that share a board (tables must be built)"""
+    board_key = 0
+    board_suits = 0
+    for i in board:
+        board_key += _INDEX_RANK_KEYS[i]
+        board_suits += _INDEX_SUIT_KEYS[i]
+
+    # With fewer than 3 board cards of any suit two hole cards can't make a
+    # flush, and every hand is a single unsuited lookup
+    if not (board_suits + 0x5555) & _FLUSH_BITS:
+        unsuited = _UNSUITED_TABLE
+        rank_keys = _INDEX_RANK_KEYS
+        if all(len(hand) == 2 for hand in hands):
+            return [unsuited[board_key + rank_keys[a] + rank_keys[b]] for a, b in hands]
+
+    suit_masks = [0, 0, 0, 0]
+    for i in board:
+        suit_masks[i & 3] |= 1 << (i >> 2)
+
+    strengths = []
+    for hand in hands:
+        key = board_key
+        suits = board_suits
+        for i in hand:
+            key += _INDEX_RANK_KEYS[i]
+            suits += _INDEX_SUIT_KEYS[i]
+
+        if (suits + _FLUSH_CHECK) & _FLUSH_BITS:
+            flush_suit = 0
+            while (suits >> (4 * flush_suit)) & 0xF < 5:
+                flush_suit += 1
+            mask = suit_masks[flush_suit]
+            for i in hand:
+                if i & 3 == flush_suit:
+                    mask |= 1 << (i >> 2)
+            strengths.append(_FLUSH_TABLE[mask])
+        else:
+            strengths.append(_UNSUITED_TABLE[key])
+    return strengths
+
+
+def _flush_mask(cards, suits):
+    """Rank mask of the flush suit, given the packed suit counts of `cards`"""
+    flush_suit = 0
+    while (suits >> (4 * flush_suit)) & 0xF < 5:
+        flush_suit += 1
+    mask = 0
+    for i in cards:
+        if i & 3 == flush_suit:
+            mask |= 1 << (i >> 2)
+    return mask
+
+
+def _highest_straight(mask):
+    """Return the tiebreakers of the highest straight in a rank mask, or None"""
+    for high in range(12, 3, -1):
+        window = 0b11111 << (high - 4)
+        if mask & window == window:
+            return list(range(high, high - 5, -1))
+    wheel = (1 << 12) | 0b1111
+    if mask & wheel == wheel:
+        return [3, 2, 1, 0, 12]
+    return None
+
+
+def _hand_class_list():
+    """All 7462 hand classes as (hand_name, hand_rank, tiebreakers), worst first"""
+    straights = [list(range(high, high - 5, -1)) for high in range(4, 13)]
+    straights.insert(0, [3, 2, 1, 0, 12])
+    straight_masks = {sum(1 << r for r in s) for s in straights}
+
+    no_straight = [
+        list(ranks) for ranks in combinations(range(12, -1, -1), 5)
+        if sum(1 << r for r in ranks) not in straight_masks
+    ]
+    no_straight.sort()
+
+    def others(*used):
+        return [r for r in range(12, -1, -1) if r not in used]
+
+    pairs = sorted([p] + list(k) for p in range(13) for k in combinations(others(p), 3))
+    two_pairs = sorted(
+        [hi, lo, k] for hi in range(13) for lo in range(hi) for k in others(hi, lo)
+    )
+    trips = sorted([t] + list(k) for t in range(13) for k in combinations(others(t), 2))
+    full_houses = sorted([t, p] for t in range(13) for p in others(t))
+    quads = sorted([q, k] for q in range(13) for k in others(q))
+
+    classes = []
+    classes += [('High Card', 1, tb) for tb in no_straight]
+    classes += [('One Pair', 2, tb) for tb in pairs]
+    classes += [('Two Pair', 3, tb) for tb in two_pairs]
+    classes += [('Three of a Kind', 4, tb) for tb in trips]
+    classes += [('Straight', 5, tb) for tb in straights]
+    classes += [('Flush', 6, tb) for tb in no_straight]
+    classes += [('Full House', 7, tb) for tb in full_houses]
+    classes += [('Four of a Kind', 8, tb) for tb in quads]
+    classes += [('Straight Flush', 9, tb) for tb in straights[:-1]]
+    classes += [('Royal Flush', 10, straights[-1])]
+    return classes
+
+
+def _best_unsuited(counts):
+    """Best non-flush hand for a rank count vector, as (hand_rank, tiebreakers)"""
+    present = [r for r in range(12, -1, -1) if counts[r]]
+    quads = [r for r in present if counts[r] == 4]
+    trips = [r for r in present if counts[r] == 3]
+    pairs = [r for r in present if counts[r] == 2]
+
+    if quads:
+        return 8, [quads[0], [r for r in present if r != quads[0]][0]]
+
+    if trips and len(trips) + len(pairs) >= 2:
+        return 7, [trips[0], max(trips[1:] + pairs)]
+
+    straight = _highest_straight(sum(1 << r for r in present))
+    if straight:
+        return 5, straight
+
+    if trips:
+        return 4, [trips[0]] + [r for r in present if r != trips[0]][:2]
+
+    if len(pairs) >= 2:
+        return 3, pairs[:2] + [r for r in present if r not in pairs[:2]][:1]
+
+    if pairs:
+        return 2, [pairs[0]] + [r for r in present if r != pairs[0]][:3]
+
+    return 1, present[:5]
+
+
+def _hand_tuple(value):
+    """(hand_name, hand_rank, tiebreakers) for a hand value, with a fresh tiebreaker list"""
+    name, rank, tiebreakers = _HAND_CLASSES[value]
+    return (name, rank, list(tiebreakers))
+
+
+def _build_tables():
+    """Build the hand class, flush and unsuited lookup tables"""
+    global _HAND_CLASSES, _CLASS_VALUES, _FLUSH_TABLE, _UNSUITED_TABLE
+
+    classes = _hand_class_list()
+    index = {(rank, tuple(tb)): value for value, (_, rank, tb) in enumerate(classes, 1)}
+
+    # Five-card hands are scored directly. The best 5 of 6 or 7 cards is the
+    # best of its one-card-smaller subsets, so larger hands are filled in
+    # from the previous size instead of being scored again.
+    flush_table = [0] * 8192
+    level = {}
+    for ranks in combinations(range(13), 5):
+        mask = sum(1 << r for r in ranks)
+        straight = _highest_straight(mask)
+        if straight:
+            rank = 10 if straight[0] == 12 else 9
+            level[mask] = index[(rank, tuple(straight))]
+        else:
+            level[mask] = index[(6, tuple(sorted(ranks, reverse=True)))]
+    for _ in (6, 7):
+        for mask, value in level.items():
+            flush_table[mask] = value
+        bigger = {}
+        for mask, value in level.items():
+            for r in range(13):
+                if not mask >> r & 1:
+                    key = mask | 1 << r
+                    if bigger.get(key, 0) < value:
+                        bigger[key] = value
+        level = bigger
+    for mask, value in level.items():
+        flush_table[mask] = value
+
+    unsuited_table = {}
+    level = {}
+    for ranks in combinations_with_replacement(range(13), 5):
+        counts = [0] * 13
+        for r in ranks:
+            counts[r] += 1
+        if max(counts) > 4:
+            continue
+        rank, tb = _best_unsuited(counts)
+        level[sum(_RANK_KEYS[r] for r in ranks)] = index[(rank, tuple(tb))]
+    for _ in (6, 7):
+        # Rank keys with different card counts never collide
+        unsuited_table.update(level)
+        bigger = {}
+        for key, value in level.items():
+            for r in range(13):
+                if key // _RANK_KEYS[r] % 5 < 4:
+                    bigger_key = key + _RANK_KEYS[r]
+                    if bigger.get(bigger_key, 0) < value:
+                        bigger[bigger_key] = value
+        level = bigger
+    unsuited_table.update(level)
+
+    _HAND_CLASSES = [('Incomplete Hand', 0, ())] + [
+        (name, rank, tuple(tb)) for name, rank, tb in classes
+    ]
+    _CLASS_VALUES = index
+    _FLUSH_TABLE = flush_table
+    _UNSUITED_TABLE = unsuited_table
+
+
+
+def _build_array_tables():
+    """Build numpy lookup arrays for evaluate_strength_array"""
+    global _ARRAY_TABLES
+
+    if _HAND_CLASSES is None:
+        _build_tables()
+
+    ranks = np.arange(52) >> 2
+    suits = np.arange(52) & 3
+    unsuited_keys = np.array(sorted(_UNSUITED_TABLE), dtype=np.int64)
+
+    _ARRAY_TABLES = {
+        'rank_keys': np.array(_RANK_KEYS, dtype=np.int64)[ranks],
+        'suit_keys': (1 << (4 * suits)).astype(np.int64),
+        'rank_bits': (1 << ranks).astype(np.int64),
+        'flush_values': np.array(_FLUSH_TABLE, dtype=np.int32),
+        'unsuited_keys': unsuited_keys,
+        'unsuited_values': np.array([_UNSUITED_TABLE[k] for k in unsuited_keys.tolist()],
+                                    dtype=np.int32),
+    }
+    return _ARRAY_TABLES
+
+
+# The 52 interned cards in index order
+_DECK = tuple(Card(rank, suit) for rank in Card.RANKS for suit in Card.SUITS)
+_PARSED = {repr(c): c for c in _DECK}
+
+
 def create_deck():
-    """Create a standard 52-card deck"""
-    return [Card(rank, suit) for rank in Card.RANKS for suit in Card.SUITS]
+    """Create a standard 52-card deck (a new list of the shared Card objects)"""
+    return list(_DECK)
 
 
 def parse_card(card_str):
     """Parse a card string like 'Ah' into a Card object"""
+    card = _PARSED.get(card_str)
+    if card is not None:
+        return card
     if len(card_str) != 2:
         raise ValueError(f"Invalid card string: {card_str}")
     return Card(card_str[0], card_str[1])
+
+
+def card_to_index(card):
+    """Card -> integer 0-51 (rank-major, matching create_deck order)"""
+    return card.index
+
+
+def index_to_card(index):
+    """Integer 0-51 -> Card"""
+    return _DECK[index]
@@ -0,0 +1,208 @@
+"""
+Preflop Equity Table
+All-in equity for the 169 starting-hand classes against 1-3 random opponents,
+and against 1-3 opponents playing each range of TIGHTNESS_LEVELS
+
+The table is generated offline (python preflop_equity.py) and loaded on
+first lookup. Preflop equity then costs one dictionary lookup instead of a
+simulation.
+"""
+
+import json
+import os
+
+from poker_evaluator import Card, create_deck
+
+TABLE_VERSION = 1
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.json')
+MAX_OPPONENTS = 3
+
+# Opponent tightness levels with their own range tables (tightness 0 plays
+# every hand, so the random-opponent table covers it)
+TIGHTNESS_LEVELS = tuple(i / 10 for i in range(1, 11))
+
+_table = None
+
+
+def hand_class(hole_cards):
+    """Canonical starting-hand class: 'AA', 'AKs' or 'AKo'"""
+    c1, c2 = sorted(hole_cards, key=lambda c: c.rank_value, reverse=True)
+    if c1.rank == c2.rank:
+        return c1.rank + c2.rank
+    return c1.rank + c2.rank + ('s' if c1.suit == c2.suit else 'o')
+
+
+def all_hand_classes():
+    """All 169 starting-hand classes, pairs then suited then offsuit"""
+    ranks = Card.RANKS[::-1]
+    classes = [r + r for r in ranks]
+    for suffix in ('s', 'o'):
+        classes += [hi + lo + suffix for i, hi in enumerate(ranks) for lo in ranks[i + 1:]]
+    return classes
+
+
+def example_hand(hand_class_name):
+    """Two Card objects belonging to a starting-hand class"""
+    hi, lo = hand_class_name[0], hand_class_name[1]
+    if hi == lo:
+        return [Card(hi, 'h'), Card(lo, 's')]
+    return [Card(hi, 'h'), Card(lo, 'h' if hand_class_name[2] == 's' else 's')]
+
+
+def load_table(path=TABLE_FILE):
+    """
+    Load the equity table, or return None if it is missing or was built for
+    a different table version
+    """
+    global _table
+
+    if _table is not None and path == TABLE_FILE:
+        return _table
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if data.get('version') != TABLE_VERSION:
+        return None
+
+    if path == TABLE_FILE:
+        _table = data
+    return data
+
+
+def lookup(hole_cards, num_opponents, opponent_range=None):
+    """
+    Preflop equity from the table
+
+    Args:
+        opponent_range: Optional HandRange every opponent plays (None =
+                        random opponents); only the ranges built for
+                        TIGHTNESS_LEVELS are in the table
+
+    Returns:
+        Dictionary with win_pct, tie_pct, lose_pct, equity and the number of
+        simulations behind them, or None when the table is unavailable or
+        doesn't cover num_opponents or the range
+    """
+    if not 1 <= num_opponents <= MAX_OPPONENTS:
+        return None
+
+    table = load_table()
+    if table is None:
+        return None
+
+    equities = table['equities']
+    simulations = table['simulations']
+    if opponent_range is not None:
+        ranged = table.get('ranges', {}).get(opponent_range.fingerprint)
+        if ranged is None:
+            return None
+        equities = ranged['equities']
+        simulations = table['range_simulations']
+
+    win_pct, tie_pct = equities[hand_class(hole_cards)][num_opponents - 1]
+    return {
+        'win_pct': round(win_pct, 1),
+        'tie_pct': round(tie_pct, 1),
+        'lose_pct': round(100 - win_pct - tie_pct, 1),
+        'equity': round(win_pct + tie_pct / 2, 1),
+        'simulations': simulations,
+    }
+
+
+def build_table(simulations=200000, seed=2024, workers=0):
+    """Simulate every starting-hand class against 1-3 opponents"""
+    from equity_calculator import EquityCalculator
+
+    calc = EquityCalculator(simulations=simulations, exact=False, workers=workers,
+                            seed=seed, preflop_table=False)
+    equities = {}
+    try:
+        for name in all_hand_classes():
+            hole = example_hand(name)
+            stub = [c for c in create_deck() if c not in hole]
+            row = []
+            for num_opponents in range(1, MAX_OPPONENTS + 1):
+                wins, ties, _ = calc._simulate(hole, [], stub, num_opponents, simulations)
+                row.append([round(100 * wins / simulations, 3), round(100 * ties / simulations, 3)])
+            equities[name] = row
+    finally:
+        calc.close()
+
+    return {
+        'version': TABLE_VERSION,
+        'simulations': simulations,
+        'seed': seed,
+        'equities': equities,
+    }
+
+
+def build_range_tables(simulations=20000, seed=2024, workers=0):
+    """
+    Simulate every starting-hand class against 1-3 opponents playing the
+    range of each tightness level, one run per opponent count (a shared
+    pass would let unplayed range hands skew the smaller counts). Ranges
+    are ranked by the random-opponent table, so build that first.
+
+    Returns:
+        Dict of range fingerprint -> {'tightness', 'equities'}
+    """
+    from equity_calculator import EquityCalculator
+    from hand_range import HandRange
+
+    global _table
+    _table = None  # rank hands by the table on disk, not a stale copy
+
+    calc = EquityCalculator(exact=False, workers=workers, seed=seed, preflop_table=False)
+    ranges = {}
+    try:
+        for tightness in TIGHTNESS_LEVELS:
+            opponent_range = HandRange.from_tightness(tightness)
+            equities = {}
+            for name in all_hand_classes():
+                hole = example_hand(name)
+                stub = [c for c in create_deck() if c not in hole]
+                row = []
+                for num_opponents in range(1, MAX_OPPONENTS + 1):
+                    wins, ties, _ = calc._simulate(hole, [], stub, num_opponents, simulations,
+                                                   ranges=(opponent_range,) * num_opponents)
+                    row.append([round(100 * wins / simulations, 3),
+                                round(100 * ties / simulations, 3)])
+                equities[name] = row
+            ranges[opponent_range.fingerprint] = {'tightness': tightness, 'equities': equities}
+    finally:
+        calc.close()
+    return ranges
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the preflop equity table')
+    parser.add_argument('--simulations', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--range-simulations', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--output', default=TABLE_FILE)
+    parser.add_argument('--ranges-only', action='store_true',
+                        help="Rebuild only the range tables, keeping the random-opponent table")
+    args = parser.parse_args()
+
+    if args.ranges_only:
+        table = load_table(args.output)
+        if table is None:
+            parser.error(f"No version {TABLE_VERSION} table at {args.output}")
+    else:
+        table = build_table(args.simulations, args.seed, args.workers)
+        with open(args.output, 'w') as f:
+            json.dump(table, f, separators=(',', ':'), sort_keys=True)
+
+    table['range_simulations'] = args.range_simulations
+    table['ranges'] = build_range_tables(args.range_simulations, args.seed, args.workers)
+    with open(args.output, 'w') as f:
+        json.dump(table, f, separators=(',', ':'), sort_keys=True)
+    print(f"Wrote {len(table['equities'])} hand classes and {len(table['ranges'])} ranges "
+          f"to {args.output}")
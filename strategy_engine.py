@@ -3,6 +3,8 @@ Strategy Engine
 Provides poker strategy recommendations based on hand strength, position, and opponent tendencies
 """
 
+import preflop_equity
+from hand_range import HandRange
 from poker_evaluator import Card
 
 class StrategyEngine:
@@ -14,6 +16,7 @@ class StrategyEngine:
     def __init__(self):
         self.opponent_tightness = 0.5  # 0 = very loose, 1 = very tight
         self.opponent_aggression = 0.5  # 0 = very passive, 1 = very aggressive
+        self._range = None  # (tightness, HandRange) last built by opponent_range
 
     def update_opponent_tendencies(self, tightness, aggression):
         """
@@ -24,6 +27,18 @@ class StrategyEngine:
         self.opponent_tightness = max(0.0, min(1.0, tightness))
         self.opponent_aggression = max(0.0, min(1.0, aggression))
 
+    def opponent_range(self):
+        """
+        Hand range the opponents are assumed to play, from their tightness
+        rounded to the nearest of the preflop table's tightness levels, so
+        preflop equity against it is a table lookup
+        """
+        tightness = min((0.0,) + preflop_equity.TIGHTNESS_LEVELS,
+                        key=lambda level: abs(level - self.opponent_tightness))
+        if self._range is None or self._range[0] != tightness:
+            self._range = (tightness, HandRange.from_tightness(tightness))
+        return self._range[1]
+
     def get_recommendation(self, equity_data, position, num_opponents, street, facing_bet=False):
         """
         Get strategy recommendation
@@ -48,13 +63,15 @@ class StrategyEngine:
         # Adjust equity based on position
         adjusted_equity = equity + position_strength
 
-        # Adjust for opponent tendencies
-        if self.opponent_tightness > 0.6:
-            # Against tight players, be more aggressive (they fold more)
-            adjusted_equity += 5
-        elif self.opponent_tightness < 0.4:
-            # Against loose players, tighten up (they call more)
-            adjusted_equity -= 5
+        # Adjust for opponent tendencies; equity computed against their range
+        # already accounts for how tight they play
+        if not equity_data.get('vs_range'):
+            if self.opponent_tightness > 0.6:
+                # Against tight players, be more aggressive (they fold more)
+                adjusted_equity += 5
+            elif self.opponent_tightness < 0.4:
+                # Against loose players, tighten up (they call more)
+                adjusted_equity -= 5
 
         if self.opponent_aggression > 0.6 and facing_bet:
             # Against aggressive players when facing a bet, need stronger hands
@@ -2,9 +2,29 @@
 Test script to verify poker logic works correctly
 """
 
-from poker_evaluator import Card, HandEvaluator, parse_card
-from equity_calculator import EquityCalculator
+import asyncio
+import json
+import os
+import pickle
+import random
+import struct
+import tempfile
+import threading
+import time
+
+from poker_evaluator import EVALUATOR_VERSION, Card, HandEvaluator, create_deck, index_to_card, parse_card
+from equity_calculator import EquityCalculator, np
+from equity_cache import PersistentEquityCache, canonical_key
+from dealing import deal
+from hand_range import HandRange
+import preflop_equity
 from strategy_engine import StrategyEngine
+from analysis_pipeline import AnalysisPipeline, AnalysisWorker, Coalescer
+import batch_analysis
+import benchmark
+from equity_service import EquityService
+import instrumentation
+import timing
 
 def test_hand_evaluator():
     """Test hand evaluation"""
@@ -33,9 +53,140 @@ def test_hand_evaluator():
     print(f"✓ One Pair test: {hand_name} (rank: {rank})")
     assert hand_name == "One Pair", "One Pair not detected"
 
+    # Wheel (A-2-3-4-5) is the lowest straight
+    wheel = HandEvaluator.evaluate_hand([Card('A', 'h'), Card('2', 's')],
+                                        [Card('3', 'd'), Card('4', 'h'), Card('5', 'c')])
+    six_high = HandEvaluator.evaluate_hand([Card('6', 'h'), Card('2', 's')],
+                                           [Card('3', 'd'), Card('4', 'h'), Card('5', 'c')])
+    print(f"✓ Wheel test: {wheel[0]} ranks below 6-high {six_high[0]}")
+    assert wheel[0] == six_high[0] == "Straight"
+    assert wheel[2] < six_high[2], "Wheel should lose to a 6-high straight"
+
     print("\n✅ All hand evaluator tests passed!\n")
 
 
+def test_lookup_evaluator_matches_exhaustive():
+    """Lookup-table evaluator agrees with the all-subsets reference"""
+    print("=" * 50)
+    print("TESTING LOOKUP EVALUATOR")
+    print("=" * 50)
+
+    rng = random.Random(42)
+    deck = create_deck()
+
+    for _ in range(3000):
+        cards = rng.sample(deck, rng.choice([5, 6, 7]))
+        fast = HandEvaluator.evaluate_hand(cards[:2], cards[2:])
+        reference = HandEvaluator._evaluate_exhaustive(cards)
+        assert fast == reference, f"Mismatch on {cards}: {fast} != {reference}"
+
+    print("✓ 3000 random hands match the exhaustive evaluator")
+
+    # Results don't alias the lookup tables: editing one leaves later calls intact
+    hole, board = cards[:2], cards[2:]
+    first = HandEvaluator.evaluate_hand(hole, board)
+    first[2].append(99)
+    assert HandEvaluator.evaluate_hand(hole, board) == reference
+    print("✓ Tiebreakers are fresh lists on every call")
+    print("\n✅ Lookup evaluator tests passed!\n")
+
+
+def test_card_interning():
+    """Cards are shared, immutable flyweights carrying their integer index"""
+    print("=" * 50)
+    print("TESTING CARD INTERNING")
+    print("=" * 50)
+
+    assert Card('A', 'h') is Card('a', 'H') is parse_card('Ah')
+    assert create_deck()[51] is parse_card('As') is index_to_card(51)
+    assert pickle.loads(pickle.dumps(parse_card('Td'))) is parse_card('Td')
+    assert [c.index for c in create_deck()] == list(range(52))
+    print("✓ Card('A', 'h'), parse_card('Ah') and index 48 are one object")
+
+    try:
+        parse_card('Ah').rank = 'K'
+        assert False, "Cards should be immutable"
+    except AttributeError:
+        pass
+    for bad in ('1h', 'Ax', 'A'):
+        try:
+            parse_card(bad)
+            assert False, f"{bad} should not parse"
+        except ValueError:
+            pass
+
+    rng = random.Random(3)
+    for _ in range(500):
+        cards = rng.sample(create_deck(), 7)
+        assert HandEvaluator.evaluate_strength_indices([c.index for c in cards]) == \
+            HandEvaluator.evaluate_strength(cards[:2], cards[2:])
+    print("✓ Index evaluation matches Card evaluation")
+
+    print("\n✅ Card interning tests passed!\n")
+
+
+def test_batch_evaluation():
+    """Many hands scored against one shared board match one-at-a-time scoring"""
+    print("=" * 50)
+    print("TESTING BATCH EVALUATION")
+    print("=" * 50)
+
+    rng = random.Random(19)
+    evaluate = HandEvaluator.evaluate_strength_indices
+    for board_size in (3, 4, 5):
+        for _ in range(300):
+            cards = rng.sample(range(52), board_size + 12)
+            board, rest = cards[:board_size], cards[board_size:]
+            hands = [rest[i:i + 2] for i in range(0, 12, 2)]
+            assert HandEvaluator.evaluate_strength_batch(board, hands) == \
+                [evaluate(hand + board) for hand in hands]
+    print("✓ Batch matches single evaluation on flops, turns and rivers")
+
+    # Flush-heavy boards take the per-suit mask path
+    index = lambda *names: [parse_card(name).index for name in names]
+    board = index('2h', '7h', 'Jh', 'Ks', '2d')
+    hands = [index('5h', 'Qh'), index('9h', 'As'), index('Ac', 'Ad')]
+    strengths = HandEvaluator.evaluate_strength_batch(board, hands)
+    assert [HandEvaluator.strength_name(s) for s in strengths] == ['Flush', 'One Pair', 'Two Pair']
+    assert strengths == [evaluate(hand + board) for hand in hands]
+    assert HandEvaluator.evaluate_strength_batch(board, []) == []
+    print("✓ Flush draws complete from the board's suit masks")
+
+    print("\n✅ Batch evaluation tests passed!\n")
+
+
+def test_hand_strength():
+    """Integer strengths order hands and map back to names"""
+    print("=" * 50)
+    print("TESTING HAND STRENGTH")
+    print("=" * 50)
+
+    royal = HandEvaluator.evaluate_strength([Card('A', 'h'), Card('K', 'h')],
+                                            [Card('Q', 'h'), Card('J', 'h'), Card('T', 'h')])
+    worst = HandEvaluator.evaluate_strength([Card('7', 'h'), Card('5', 's')],
+                                            [Card('4', 'd'), Card('3', 'h'), Card('2', 'c')])
+    print(f"✓ Royal flush strength: {royal}, 7-high strength: {worst}")
+    assert royal == HandEvaluator.MAX_STRENGTH
+    assert worst == 1
+    assert HandEvaluator.strength_name(royal) == 'Royal Flush'
+    assert HandEvaluator.evaluate_strength([Card('A', 'h')], []) == 0
+
+    rng = random.Random(7)
+    deck = create_deck()
+    hands = [rng.sample(deck, 7) for _ in range(500)]
+    for a, b in zip(hands, hands[1:]):
+        hand_a = HandEvaluator.evaluate_hand(a[:2], a[2:])
+        hand_b = HandEvaluator.evaluate_hand(b[:2], b[2:])
+        strength_a = HandEvaluator.evaluate_strength(a[:2], a[2:])
+        strength_b = HandEvaluator.evaluate_strength(b[:2], b[2:])
+        assert HandEvaluator.strength_name(strength_a) == hand_a[0]
+        assert HandEvaluator.strength_to_hand(strength_a) == hand_a
+        assert (strength_a > strength_b) == (hand_a[1:] > hand_b[1:])
+
+    print("✓ Strength order matches (rank, tiebreakers) order")
+    print("\n✅ Hand strength tests passed!\n")
+
+
 def test_equity_calculator():
     """Test equity calculation"""
     print("=" * 50)
@@ -73,6 +224,517 @@ def test_equity_calculator():
     print("\n✅ All equity calculator tests passed!\n")
 
 
+def test_vectorized_equity():
+    """Numpy backend matches the scalar path within statistical tolerance"""
+    print("=" * 50)
+    print("TESTING VECTORIZED EQUITY")
+    print("=" * 50)
+
+    if np is None:
+        print("numpy not installed, skipping")
+        return
+
+    rng = random.Random(11)
+    hands = [rng.sample(range(52), 7) for _ in range(2000)]
+    strengths = HandEvaluator.evaluate_strength_array(np.array(hands))
+    for hand, strength in zip(hands, strengths):
+        cards = [index_to_card(i) for i in hand]
+        assert strength == HandEvaluator.evaluate_strength(cards[:2], cards[2:])
+    print("✓ Array evaluator matches evaluate_strength on 2000 hands")
+
+    hole = [Card('A', 'h'), Card('K', 'h')]
+    board = [Card('Q', 'h'), Card('7', 'c'), Card('2', 'h')]
+    scalar = EquityCalculator(simulations=6000, backend='python').calculate_equity(hole, board, 2)
+    batched = EquityCalculator(simulations=60000, backend='numpy').calculate_equity(hole, board, 2)
+
+    print(f"✓ AhKh on Qh7c2h vs 2: python {scalar['equity']}%, numpy {batched['equity']}%")
+    assert abs(scalar['equity'] - batched['equity']) < 3, "Backends disagree"
+    assert batched['current_hand'] == scalar['current_hand']
+
+    print("\n✅ Vectorized equity tests passed!\n")
+
+
+def test_dealing():
+    """Partial Fisher-Yates deals and a pluggable RNG"""
+    print("=" * 50)
+    print("TESTING DEALING")
+    print("=" * 50)
+
+    rng = random.Random(11)
+    cards = list(range(10))
+    firsts = [0] * 10
+    for _ in range(20000):
+        deal(cards, 3, rng.random)
+        assert len(set(cards[:3])) == 3 and sorted(cards) == list(range(10))
+        firsts[cards[0]] += 1
+    print(f"✓ First dealt card counts: {firsts}")
+    assert all(1700 < n < 2300 for n in firsts), "Every card should be dealt first ~10% of the time"
+
+    class CountingRandom(random.Random):
+        draws = 0
+
+        def random(self):
+            CountingRandom.draws += 1
+            return super().random()
+
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    board = [parse_card(c) for c in ['Qs', '7h', '2c']]
+    results = [
+        EquityCalculator(simulations=2000, backend='python', exact=False, seed=8,
+                         rng_factory=CountingRandom).calculate_equity(hole, board, 2)
+        for _ in range(2)
+    ]
+    assert results[0] == results[1], "Seeded custom RNG should be reproducible"
+    assert CountingRandom.draws == 2 * 2000 * 6, "Only 2 board + 4 opponent cards are drawn per trial"
+    print(f"✓ Custom RNG drew {CountingRandom.draws} numbers for 4000 trials")
+
+    print("\n✅ Dealing tests passed!\n")
+
+
+def test_exact_equity():
+    """Turn and river equity is enumerated exactly when that is cheaper"""
+    print("=" * 50)
+    print("TESTING EXACT EQUITY")
+    print("=" * 50)
+
+    hole = [parse_card('Ah'), parse_card('Kh')]
+    river = [parse_card(c) for c in ['Qh', '7c', '2h', '9s', '3d']]
+    turn = river[:4]
+
+    calc = EquityCalculator(simulations=1000, backend='python')
+    first = calc.calculate_equity(hole, river, 1)
+    second = calc.calculate_equity(hole, river, 1)
+    print(f"✓ River vs 1: {first['equity']}% via {first['method']}")
+    assert first['method'] == 'exact'
+    assert first == second, "Exact equity should not vary between runs"
+
+    exact_turn = EquityCalculator(backend='python', exact=True).calculate_equity(hole, turn, 1)
+    print(f"✓ Turn vs 1: {exact_turn['equity']}% via {exact_turn['method']}")
+    if np is not None:
+        batched_turn = EquityCalculator(backend='numpy', exact=True).calculate_equity(hole, turn, 1)
+        assert batched_turn == exact_turn, "Exact backends disagree"
+
+        # Flushes on board: opponents' holdings share suits with the runouts,
+        # so overlapping holdings must be dropped before they are scored
+        for hole_text, board_text in (('2c 3d', 'Qh Jh 9h 4s'), ('As Kd', '7h 6h 5h 4h')):
+            flush_hole = [parse_card(c) for c in hole_text.split()]
+            flush_turn = [parse_card(c) for c in board_text.split()]
+            batched = EquityCalculator(backend='numpy', exact=True).calculate_equity(
+                flush_hole, flush_turn, 1)
+            single = EquityCalculator(backend='python', exact=True).calculate_equity(
+                flush_hole, flush_turn, 1)
+            assert batched == single, f"Exact backends disagree on {board_text}"
+        print(f"✓ Flush-board turn {board_text}: {batched['equity']}% on both backends")
+
+    multiway = EquityCalculator(simulations=2000, backend='python').calculate_equity(hole, turn, 2)
+    print(f"✓ Turn vs 2: {multiway['equity']}% via {multiway['method']}")
+    assert multiway['method'] == 'stratified'
+
+    # 2000 trials over 1081 flop runouts would keep only 1081 stratified
+    # trials, so the flop samples runouts instead and keeps all of them
+    flop_multiway = EquityCalculator(simulations=2000, backend='python').calculate_equity(
+        hole, turn[:3], 2)
+    assert flop_multiway['method'] == 'monte_carlo'
+    assert flop_multiway['simulations'] == 2000
+
+    sampled = EquityCalculator(simulations=500, exact=False).calculate_equity(hole, river, 1)
+    assert sampled['method'] == 'monte_carlo'
+
+    print("\n✅ Exact equity tests passed!\n")
+
+
+def test_parallel_equity():
+    """Seeded runs reproduce, in-process and across worker processes"""
+    print("=" * 50)
+    print("TESTING PARALLEL EQUITY")
+    print("=" * 50)
+
+    hole = [parse_card('Ah'), parse_card('Kh')]
+    board = [parse_card(c) for c in ['Qh', '7c', '2h']]
+
+    first = EquityCalculator(simulations=3000, exact=False, seed=99).calculate_equity(hole, board, 2)
+    second = EquityCalculator(simulations=3000, exact=False, seed=99).calculate_equity(hole, board, 2)
+    print(f"✓ Seeded in-process runs: {first['equity']}% and {second['equity']}%")
+    assert first == second, "Same seed should give the same result"
+
+    results = []
+    for _ in range(2):
+        calc = EquityCalculator(simulations=3000, exact=False, workers=2, seed=99)
+        calc.PARALLEL_THRESHOLD = 1000
+        try:
+            results.append(calc.calculate_equity(hole, board, 2))
+            results.append(calc.calculate_equity(hole, board, 2))
+        finally:
+            calc.close()
+
+    print(f"✓ Seeded 2-worker runs: {[r['equity'] for r in results]}")
+    assert results[0] == results[2] and results[1] == results[3], "Worker runs should reproduce"
+    assert abs(results[0]['equity'] - first['equity']) < 5
+
+    print("\n✅ Parallel equity tests passed!\n")
+
+
+def test_preflop_equity_table():
+    """Preflop spots come from the precomputed table"""
+    print("=" * 50)
+    print("TESTING PREFLOP EQUITY TABLE")
+    print("=" * 50)
+
+    classes = preflop_equity.all_hand_classes()
+    assert len(set(classes)) == 169
+    assert preflop_equity.hand_class([parse_card('Kd'), parse_card('Ad')]) == 'AKs'
+    assert preflop_equity.hand_class([parse_card('7h'), parse_card('2s')]) == '72o'
+    assert preflop_equity.hand_class([parse_card('9c'), parse_card('9d')]) == '99'
+
+    hole = [parse_card('As'), parse_card('Kd')]
+    calc = EquityCalculator(simulations=100000)
+    table = calc.calculate_equity(hole, [], 2)
+    simulated = EquityCalculator(simulations=20000, preflop_table=False).calculate_equity(hole, [], 2)
+
+    print(f"✓ AKo vs 2: table {table['equity']}%, simulated {simulated['equity']}%")
+    assert table['method'] == 'table'
+    assert simulated['method'] != 'table'
+    assert abs(table['equity'] - simulated['equity']) < 3
+
+    aces = calc.calculate_equity([parse_card('Ah'), parse_card('Ac')], [], 1)
+    print(f"✓ AA vs 1: {aces['equity']}%")
+    assert 84 < aces['equity'] < 87
+
+    print("\n✅ Preflop equity table tests passed!\n")
+
+
+def test_adaptive_equity():
+    """Adaptive mode stops once the standard error target is met"""
+    print("=" * 50)
+    print("TESTING ADAPTIVE EQUITY")
+    print("=" * 50)
+
+    calc = EquityCalculator(seed=3)
+
+    # Top set is nearly a lock; a pair + flush draw is close to a coin flip
+    lock = calc.calculate_equity_adaptive(
+        [parse_card('Ah'), parse_card('Ad')], [parse_card(c) for c in ['As', 'Kd', '2c']],
+        2, target_error=0.5, chunk_size=1000
+    )
+    close = calc.calculate_equity_adaptive(
+        [parse_card('7h'), parse_card('8h')], [parse_card(c) for c in ['9h', 'Tc', '2h']],
+        2, target_error=0.5, chunk_size=1000
+    )
+
+    print(f"✓ Lock: {lock['equity']}% ± {lock['std_error']} after {lock['simulations']} trials")
+    print(f"✓ Close: {close['equity']}% ± {close['std_error']} after {close['simulations']} trials")
+    assert lock['std_error'] <= 0.5 and close['std_error'] <= 0.5
+    assert lock['simulations'] < close['simulations'], "Clear-cut spots should stop sooner"
+
+    capped = calc.calculate_equity_adaptive(
+        [parse_card('7h'), parse_card('8h')], [parse_card(c) for c in ['9h', 'Tc', '2h']],
+        2, target_error=0.01, max_simulations=3000, chunk_size=1000
+    )
+    assert capped['simulations'] == 3000
+
+    for bad in ({'max_simulations': 0}, {'chunk_size': 0}):
+        try:
+            calc.calculate_equity_adaptive([parse_card('7h'), parse_card('8h')],
+                                           [parse_card(c) for c in ['9h', 'Tc', '2h']], 2, **bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+
+    # Default chunking starts small, so the lock stops well short of one full batch
+    default = EquityCalculator(seed=3).calculate_equity_adaptive(
+        [parse_card('Ah'), parse_card('Ad')], [parse_card(c) for c in ['As', 'Kd', '2c']], 2
+    )
+    print(f"✓ Default chunks: lock stops after {default['simulations']} trials")
+    assert default['std_error'] <= 0.5
+    assert default['simulations'] < 25000, "Default chunks should allow an early stop"
+
+    print("\n✅ Adaptive equity tests passed!\n")
+
+
+def test_timed_equity():
+    """Timed mode runs trials until the deadline and reports how many"""
+    print("=" * 50)
+    print("TESTING TIMED EQUITY")
+    print("=" * 50)
+
+    calc = EquityCalculator()
+    hole = [parse_card('Ah'), parse_card('Kh')]
+    flop = [parse_card(c) for c in ['Qh', '7c', '2h']]
+    calc.calculate_equity(hole, flop, 1)  # build lookup tables outside the timing
+
+    for opponents in (1, 3):
+        result = calc.quick_equity(hole, flop, opponents, time_budget_ms=50)
+        print(f"✓ vs {opponents}: {result['equity']}% from {result['simulations']} trials "
+              f"in {result['elapsed_ms']}ms")
+        assert result['simulations'] >= EquityCalculator.MIN_TIMED_CHUNK
+        assert result['elapsed_ms'] < 250, "Timed call ran far past its budget"
+
+    river = flop + [parse_card('9s'), parse_card('3d')]
+    exact = calc.calculate_equity_timed(hole, river, 1, time_budget_ms=50)
+    assert exact['method'] == 'exact' and exact['std_error'] == 0.0
+
+    capped = calc.calculate_equity_timed(hole, flop, 2, time_budget_ms=5000, max_simulations=300)
+    assert capped['simulations'] == 300
+
+    print("\n✅ Timed equity tests passed!\n")
+
+
+def test_streaming_equity():
+    """iter_equity yields sharpening estimates and ends with a final one"""
+    print("=" * 50)
+    print("TESTING STREAMING EQUITY")
+    print("=" * 50)
+
+    calc = EquityCalculator(seed=8)
+    hole = [parse_card('Ah'), parse_card('Kh')]
+    flop = [parse_card(c) for c in ['Qh', '7c', '2h']]
+
+    estimates = list(calc.iter_equity(hole, flop, 2, simulations=20000))
+    for estimate in estimates:
+        print(f"✓ {estimate['simulations']} trials: {estimate['equity']}% ± {estimate['std_error']}")
+
+    assert len(estimates) > 1
+    assert [e['final'] for e in estimates] == [False] * (len(estimates) - 1) + [True]
+    assert estimates[-1]['simulations'] == 20000
+    counts = [e['simulations'] for e in estimates]
+    assert counts == sorted(counts)
+    assert estimates[-1]['std_error'] < estimates[0]['std_error']
+
+    preflop = list(calc.iter_equity(hole, [], 2))
+    assert len(preflop) == 1 and preflop[0]['final'] and preflop[0]['method'] == 'table'
+
+    print("\n✅ Streaming equity tests passed!\n")
+
+
+def test_equity_by_opponents():
+    """One pass gives equity against 1, 2 and 3 opponents"""
+    print("=" * 50)
+    print("TESTING EQUITY BY OPPONENT COUNT")
+    print("=" * 50)
+
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    board = [parse_card(c) for c in ['Qs', '7h', '2c']]
+
+    for backend in ('python', 'numpy') if np is not None else ('python',):
+        calc = EquityCalculator(simulations=20000, backend=backend, exact=False, seed=4,
+                                cache_size=16)
+        curve = calc.calculate_equity_by_opponents(hole, board, 3)
+        print(f"✓ {backend}: " + ", ".join(f"{k} opp {r['equity']}%" for k, r in curve.items()))
+        assert sorted(curve) == [1, 2, 3]
+        assert curve[1]['equity'] > curve[2]['equity'] > curve[3]['equity']
+        assert all(r['simulations'] == 20000 and r['final'] for r in curve.values())
+
+        for k in (1, 2, 3):
+            separate = calc.calculate_equity(hole, board, k)['equity']
+            assert abs(separate - curve[k]['equity']) < 2, "Nested subsets match separate runs"
+
+        # Every count was cached, so a later stream for one count is instant
+        cached = list(calc.iter_equity(hole, board, 2, simulations=20000))
+        assert cached == [curve[2]]
+
+    curve = EquityCalculator().calculate_equity_by_opponents(hole, [], 3)
+    assert all(r['method'] == 'table' for r in curve.values())
+
+    # Against a tight range, unplayed opponents must not shape the smaller counts
+    weak = [parse_card('7h'), parse_card('2c')]
+    tight = HandRange.from_tightness(1.0)
+    calc = EquityCalculator(simulations=40000, seed=15, preflop_table=False)
+    curve = calc.calculate_equity_by_opponents(weak, [], 3, opponent_range=tight)
+    for k in (1, 2):
+        direct = calc.calculate_equity(weak, [], k, opponent_range=tight)['equity']
+        assert abs(curve[k]['equity'] - direct) < 1, f"{k} opp: curve {curve[k]['equity']}% vs {direct}%"
+    print(f"✓ 72o vs tight range: curve matches direct runs ({curve[1]['equity']}% heads-up)")
+    print("✓ Pre-flop curve comes from the table")
+
+    print("\n✅ Equity by opponent count tests passed!\n")
+
+
+def test_equity_cache():
+    """Isomorphic spots share one cache entry"""
+    print("=" * 50)
+    print("TESTING EQUITY CACHE")
+    print("=" * 50)
+
+    hearts = ([parse_card('Ah'), parse_card('Kh')], [parse_card(c) for c in ['Qh', 'Jh', '2c']])
+    spades = ([parse_card('Ks'), parse_card('As')], [parse_card(c) for c in ['2d', 'Js', 'Qs']])
+    other = ([parse_card('Ah'), parse_card('Kh')], [parse_card(c) for c in ['Qh', 'Jc', '2c']])
+
+    assert canonical_key(*hearts, 2) == canonical_key(*spades, 2)
+    assert canonical_key(*hearts, 2) != canonical_key(*other, 2)
+    assert canonical_key(*hearts, 2) != canonical_key(*hearts, 3)
+    assert canonical_key(*hearts, 2, [parse_card('3d')]) == canonical_key(*spades, 2, [parse_card('3h')])
+    print("✓ AhKh on QhJh2c and AsKs on QsJs2d share a key")
+
+    calc = EquityCalculator(simulations=2000, cache_size=2)
+    first = calc.calculate_equity(*hearts, 2)
+    second = calc.calculate_equity(*spades, 2)
+    assert first == second
+    assert calc.cache.stats()['hits'] == 1 and calc.cache.stats()['misses'] == 1
+
+    second['equity'] = -1  # callers get copies
+    assert calc.calculate_equity(*hearts, 2)['equity'] == first['equity']
+
+    calc.calculate_equity(*other, 2)
+    calc.calculate_equity(*hearts, 3)
+    stats = calc.cache.stats()
+    print(f"✓ Cache stats: {stats}")
+    assert stats['size'] == 2, "LRU should stay within maxsize"
+
+    dead = calc.calculate_equity(*hearts, 1, dead_cards=[parse_card(c) for c in ['Th', '9h', '8h', '7h']])
+    assert dead['equity'] < calc.calculate_equity(*hearts, 1)['equity'], "Dead flush cards cut equity"
+
+    print("\n✅ Equity cache tests passed!\n")
+
+
+def test_persistent_equity_cache():
+    """Results survive reopening the memory-mapped cache file"""
+    print("=" * 50)
+    print("TESTING PERSISTENT EQUITY CACHE")
+    print("=" * 50)
+
+    hole = [parse_card('Ah'), parse_card('Kh')]
+    flop = [parse_card(c) for c in ['Qh', '7c', '2h']]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'equity_cache.bin')
+
+        calc = EquityCalculator(simulations=2000, cache_path=path)
+        first = calc.calculate_equity(hole, flop, 2)
+        calc.close()
+
+        calc = EquityCalculator(simulations=2000, cache_path=path)
+        second = calc.calculate_equity(hole, flop, 2)
+        stats = calc.cache.stats()
+        calc.close()
+        print(f"✓ Warm start served from disk: {stats['backing']}")
+        assert second == first
+        assert stats['backing']['hits'] == 1
+
+        # A file written by another evaluator version is discarded
+        with open(path, 'r+b') as f:
+            f.seek(6)
+            f.write(struct.pack('<H', EVALUATOR_VERSION + 1))
+        stale = PersistentEquityCache(path)
+        assert len(stale) == 0 and stale.get(('anything',)) is None
+        stale.close()
+
+        capped = PersistentEquityCache(os.path.join(tmp, 'small.bin'), capacity=16)
+        for i in range(100):
+            capped.put(('spot', i), first)
+        print(f"✓ Capped cache: {capped.stats()}")
+        assert len(capped) == 16 and capped.stats()['evictions'] == 84
+        assert capped.get(('spot', 99)) == first
+        capped.flush()
+
+        # Recent hits don't touch the mapping
+        before = bytes(capped._map)
+        for _ in range(10):
+            capped.get(('spot', 99))
+        assert bytes(capped._map) == before, "A hit on a fresh slot dirtied the file"
+
+        capped.close()
+        for call in (lambda: capped.get(('spot', 99)), lambda: capped.put(('spot', 1), first)):
+            try:
+                call()
+                assert False, "Closed cache should refuse calls"
+            except ValueError as e:
+                assert str(e) == "cache is closed"
+        print("✓ Hits leave the file clean; a closed cache says so")
+
+        # Files that aren't this cache are refused, never overwritten
+        notes = os.path.join(tmp, 'notes.txt')
+        with open(notes, 'w') as f:
+            f.write('not a cache')
+        for file, capacity in ((notes, 16), (os.path.join(tmp, 'small.bin'), 32)):
+            with open(file, 'rb') as f:
+                before = f.read()
+            try:
+                PersistentEquityCache(file, capacity=capacity)
+                assert False, f"{file} should be refused"
+            except ValueError:
+                pass
+            with open(file, 'rb') as f:
+                assert f.read() == before
+        print("✓ Foreign files and other capacities are left untouched")
+
+    print("\n✅ Persistent equity cache tests passed!\n")
+
+
+def test_range_equity():
+    """Opponent hands drawn from weighted ranges"""
+    print("=" * 50)
+    print("TESTING RANGE EQUITY")
+    print("=" * 50)
+
+    loose = HandRange.from_tightness(0.0)
+    tight = HandRange.from_tightness(1.0)
+    assert loose.combo_fraction() == 1.0
+    assert abs(tight.combo_fraction() - 0.15) < 0.001
+    assert 'AA' in tight.class_weights and '72o' not in tight.class_weights
+    print(f"✓ Tightness ranges: loose {loose}, tight {tight}")
+
+    aces = [parse_card('Ah'), parse_card('As')]
+    calc = EquityCalculator(simulations=20000, seed=5)
+    result = calc.calculate_equity(aces, [], 1, opponent_range=HandRange.from_string('KK, QQ'))
+    print(f"✓ AA vs KK/QQ: {result['equity']}%")
+    assert result['vs_range'] and result['method'] == 'monte_carlo'
+    assert 80 <= result['equity'] <= 84
+
+    # Card removal: an opponent who only plays AA holds the last two aces
+    board = [parse_card(c) for c in ['Kd', '7c', '2s']]
+    result = calc.calculate_equity(aces, board, 1, opponent_range=HandRange.from_string('AA'))
+    assert 45 <= result['equity'] <= 55, "AA vs the other AA is close to a split"
+
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    board = [parse_card(c) for c in ['Qs', '7h', '2c']]
+    for backend in ('python', 'numpy') if np is not None else ('python',):
+        calc = EquityCalculator(simulations=20000, backend=backend, exact=False, seed=6)
+        uniform = calc.calculate_equity(hole, board, 2)['equity']
+        ranged = calc.calculate_equity(hole, board, 2, opponent_range=HandRange.uniform())['equity']
+        vs_tight = calc.calculate_equity(hole, board, 2, opponent_range=[tight, loose])['equity']
+        print(f"✓ {backend}: random {uniform}%, uniform range {ranged}%, tight+loose {vs_tight}%")
+        assert abs(uniform - ranged) < 1.5
+        assert vs_tight < ranged - 2
+
+    # Loosest opponents play every hand: same fast paths as random hands
+    assert loose.is_uniform() and HandRange.uniform().is_uniform() and not tight.is_uniform()
+    calc = EquityCalculator(simulations=20000)
+    table = calc.calculate_equity(aces, [], 2, opponent_range=loose)
+    assert table['method'] == 'table' and table['vs_range']
+    assert table['equity'] == calc.calculate_equity(aces, [], 2)['equity']
+    river = [parse_card(c) for c in ['Qs', '7h', '2c', '9d', '4c']]
+    exact = calc.calculate_equity(hole, river, 1, opponent_range=loose)
+    assert exact['method'] == 'exact' and exact['vs_range']
+    assert exact['equity'] == calc.calculate_equity(hole, river, 1)['equity']
+    print(f"✓ Tightness 0 range: pre-flop {table['method']}, river {exact['method']}")
+
+    # The app's tightness levels have their own pre-flop tables
+    strategy = StrategyEngine()
+    strategy.update_opponent_tendencies(tightness=0.47, aggression=0.5)
+    level = strategy.opponent_range()
+    assert level.fingerprint == HandRange.from_tightness(0.5).fingerprint
+    ranged = calc.calculate_equity(aces, [], 2, opponent_range=level)
+    assert ranged['method'] == 'table' and ranged['vs_range']
+    simulated = EquityCalculator(simulations=20000, seed=7, preflop_table=False).calculate_equity(
+        aces, [], 2, opponent_range=level)
+    assert abs(ranged['equity'] - simulated['equity']) < 2
+    off_level = calc.calculate_equity(aces, [], 2, opponent_range=HandRange.from_tightness(0.47))
+    assert off_level['method'] == 'monte_carlo'
+    print(f"✓ AA vs 2 at tightness 0.5: table {ranged['equity']}%, simulated {simulated['equity']}%")
+
+    # Weak hands against the tightest range are where a biased table shows
+    weak = [parse_card('7h'), parse_card('2c')]
+    simulate = EquityCalculator(simulations=40000, seed=8, preflop_table=False)
+    for k in (1, 2):
+        table_weak = calc.calculate_equity(weak, [], k, opponent_range=tight)
+        direct = simulate.calculate_equity(weak, [], k, opponent_range=tight)
+        assert table_weak['method'] == 'table'
+        assert abs(table_weak['equity'] - direct['equity']) < 1.5, (k, table_weak, direct)
+    print("✓ 72o vs tightest range matches direct simulation")
+
+    print("\n✅ Range equity tests passed!\n")
+
+
 def test_strategy_engine():
     """Test strategy recommendations"""
     print("=" * 50)
@@ -134,6 +796,499 @@ def test_strategy_engine():
     print("\n✅ All strategy engine tests passed!\n")
 
 
+def test_analysis_pipeline():
+    """Equity is memoized per spot; strategy changes don't re-simulate"""
+    print("=" * 50)
+    print("TESTING ANALYSIS PIPELINE")
+    print("=" * 50)
+
+    calc = EquityCalculator(simulations=2000, seed=9)
+    strategy = StrategyEngine()
+    pipeline = AnalysisPipeline(calc, strategy, time_budget_ms=200)
+
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    board = [parse_card(c) for c in ['Qs', '7h', '2c']]
+    assert pipeline.cached_curve(hole, board) is None
+
+    curves = list(pipeline.iter_equity(hole, board))
+    assert curves[-1][3]['final'] and pipeline.cached_curve(hole, board) is curves[-1]
+    print(f"✓ First analysis streamed {len(curves)} estimates")
+
+    # Aggression, position and bet facing only touch the strategy stage
+    strategy.update_opponent_tendencies(0.5, 0.9)
+    assert list(pipeline.iter_equity(hole, board)) == [curves[-1]]
+    passive = pipeline.recommend(curves[-1][2], 'BTN', 2, 'flop', facing_bet=True)
+    strategy.update_opponent_tendencies(0.5, 0.1)
+    aggressive = pipeline.recommend(curves[-1][2], 'BTN', 2, 'flop', facing_bet=True)
+    assert passive['adjusted_equity'] != aggressive['adjusted_equity']
+    print("✓ Strategy-only changes reuse the memoized equity")
+
+    # Tightness changes the opponents' range, so equity is recomputed
+    strategy.update_opponent_tendencies(0.9, 0.1)
+    assert pipeline.cached_curve(hole, board) is None
+    tight = list(pipeline.iter_equity(hole, board))[-1]
+    assert tight[3]['equity'] < curves[-1][3]['equity']
+    print(f"✓ Tighter opponents: {curves[-1][3]['equity']}% -> {tight[3]['equity']}% vs 3")
+
+    # The worker thread evicts while the app reads the memo
+    busy = AnalysisPipeline(calc, strategy, memo_size=2)
+    key = busy.spot_key(hole, board)
+    stop = threading.Event()
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            busy._remember(key if i % 2 else ('other', i), tight)
+            i += 1
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        for _ in range(20000):
+            busy.cached_curve(hole, board)
+    finally:
+        stop.set()
+        writer.join()
+    print("✓ Memo reads are safe while another thread evicts")
+
+    calls = []
+    coalesce = Coalescer(calls.append, delay=0.05)
+    for value in range(10):
+        coalesce(value)
+    assert coalesce.pending()
+    time.sleep(0.2)
+    assert calls == [9], "A burst runs the callback once with the last value"
+    coalesce(1)
+    coalesce.cancel()
+    time.sleep(0.1)
+    assert calls == [9]
+    print("✓ Slider bursts coalesce into one refresh")
+
+    print("\n✅ Analysis pipeline tests passed!\n")
+
+
+def test_analysis_worker():
+    """Background analysis: a newer spot cancels the running one"""
+    print("=" * 50)
+    print("TESTING ANALYSIS WORKER")
+    print("=" * 50)
+
+    pipeline = AnalysisPipeline(EquityCalculator(seed=10), StrategyEngine(), time_budget_ms=400)
+    posted = []
+    errors = []
+    worker = AnalysisWorker(pipeline, lambda curve, hole, board: posted.append((board, curve)),
+                            errors.append)
+
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    flop = [parse_card(c) for c in ['Qs', '7h', '2c']]
+    turn = flop + [parse_card('9d')]
+
+    start = time.perf_counter()
+    first = worker.submit(hole, flop)
+    time.sleep(0.05)
+    assert worker.submit(hole, flop) == first, "Resubmitting the running spot keeps it"
+    second = worker.submit(hole, turn)
+    assert second == first + 1 and not worker.is_current(first)
+
+    while pipeline.cached_curve(hole, turn) is None and time.perf_counter() - start < 5:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    time.sleep(0.05)
+    worker.stop()
+
+    print(f"✓ Turn analysis finished after {elapsed:.2f}s")
+    assert not errors
+    assert pipeline.cached_curve(hole, flop) is None, "Stale flop analysis was cancelled"
+    assert elapsed < 0.75, "The flop didn't run out its whole budget first"
+    assert posted[-1][0] == turn and posted[-1][1][3]['final']
+    first_turn = [board for board, _ in posted].index(turn)
+    assert all(board == turn for board, _ in posted[first_turn:]), "No stale flop results after"
+    print(f"✓ {len(posted)} estimates posted; the last is the turn's final result")
+
+    print("\n✅ Analysis worker tests passed!\n")
+
+
+def test_runout_speculation():
+    """Next-card equity is precomputed so the real turn/river is a memo hit"""
+    print("=" * 50)
+    print("TESTING RUNOUT SPECULATION")
+    print("=" * 50)
+
+    pipeline = AnalysisPipeline(EquityCalculator(seed=11), StrategyEngine(),
+                                time_budget_ms=50, speculative_simulations=300)
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    flop = [parse_card(c) for c in ['Qs', '7h', '2c']]
+
+    assert pipeline.next_cards(hole, []) == []
+    assert len(pipeline.next_cards(hole, flop)) == 47
+    assert all(curve is None for curve in pipeline.runout_table(hole, flop).values())
+
+    # Cancelling stops speculation between chunks
+    checks = []
+    cancelled = lambda: checks.append(1) or len(checks) > 3
+    partial = list(pipeline.iter_runouts(hole, flop, cancelled))
+    assert len(partial) < 47
+    print(f"✓ Cancelled speculation after {len(partial)} cards")
+
+    runouts = list(pipeline.iter_runouts(hole, flop))
+    assert len(partial) + len(runouts) == 47, "Memoized cards are not recomputed"
+    table = pipeline.runout_table(hole, flop)
+    assert all(curve[3]['final'] for curve in table.values())
+
+    king = parse_card('Kh')
+    turn = flop + [king]
+    assert list(pipeline.iter_equity(hole, turn)) == [table[king]], "Real turn is a memo hit"
+    print(f"✓ All 47 turns precomputed; K♥ gives {table[king][1]['win_pct']}% heads-up")
+
+    best = max(table, key=lambda card: table[card][1]['equity'])
+    assert best.rank in 'AKQJT', f"Best turn should improve AK, got {best}"
+
+    # The worker speculates once the current spot is done
+    worker = AnalysisWorker(pipeline, lambda curve, hole, board: None)
+    worker.submit(hole, turn)
+    start = time.perf_counter()
+    while (None in pipeline.runout_table(hole, turn).values()
+           and time.perf_counter() - start < 10):
+        time.sleep(0.01)
+    worker.stop()
+    assert None not in pipeline.runout_table(hole, turn).values()
+    print(f"✓ Worker precomputed all 46 rivers in {time.perf_counter() - start:.2f}s")
+
+    print("\n✅ Runout speculation tests passed!\n")
+
+
+def test_benchmark():
+    """The benchmark corpus is reproducible and reports compare across runs"""
+    print("=" * 50)
+    print("TESTING BENCHMARK")
+    print("=" * 50)
+
+    corpus = benchmark.build_corpus(seed=7, spots_per_case=2)
+    assert len(corpus) == 4 * benchmark.MAX_OPPONENTS * 2
+    assert [(s['hole'], s['board']) for s in corpus] == \
+        [(s['hole'], s['board']) for s in benchmark.build_corpus(seed=7, spots_per_case=2)]
+    assert {len(s['board']) for s in corpus} == {0, 3, 4, 5}
+    assert timing.percentile(list(range(1, 101)), 50) == 50
+    assert timing.percentile(list(range(1, 101)), 99) == 99
+    print(f"✓ Seeded corpus of {len(corpus)} spots")
+
+    report = benchmark.run(seed=7, spots_per_case=1, simulations=200, hands=500,
+                           cold_start_repeat=1)
+    report = json.loads(json.dumps(report))
+    assert set(report['equity']) == set(benchmark.STREETS)
+    assert report['evaluator']['evaluate_hand']['hands_per_sec'] > 0
+    assert report['analyze']['get_recommendation']['mean_us'] > 0
+    print(f"✓ Flop p50 {report['equity']['flop']['p50_ms']} ms, "
+          f"get_recommendation {report['analyze']['get_recommendation']['mean_us']} us")
+
+    assert benchmark.compare(report, report) == []
+    slower = json.loads(json.dumps(report))
+    slower['equity']['flop']['p99_ms'] *= 2
+    slower['evaluator']['evaluate_hand']['hands_per_sec'] //= 2
+    regressed = [metric for metric, _, _ in benchmark.compare(report, slower)]
+    assert sorted(regressed) == ['equity.flop.p99_ms', 'evaluator.evaluate_hand.hands_per_sec']
+    print("✓ Slower metrics are flagged as regressions")
+
+    # A baseline with other settings is an error message, not a traceback
+    folder = tempfile.mkdtemp()
+    baseline = os.path.join(folder, 'bench.json')
+    with open(baseline, 'w') as f:
+        json.dump(dict(report, seed=8), f)
+    status = benchmark.main(['--seed', '7', '--spots', '1', '--simulations', '200',
+                             '--hands', '500', '--compare', baseline])
+    assert status == 2
+    print("✓ Mismatched baselines exit with status 2")
+
+    print("\n✅ Benchmark tests passed!\n")
+
+
+def test_instrumentation():
+    """Hot-path counters and timers, with the original methods restored when off"""
+    print("=" * 50)
+    print("TESTING INSTRUMENTATION")
+    print("=" * 50)
+
+    original = HandEvaluator.__dict__['evaluate_strength']
+    calculate = EquityCalculator.calculate_equity
+    assert not instrumentation.is_enabled()
+
+    instrumentation.enable()
+    instrumentation.reset()
+    try:
+        assert HandEvaluator.__dict__['evaluate_strength'] is not original
+        calc = EquityCalculator(simulations=1000, seed=21, cache_size=8, preflop_table=False)
+        strategy = StrategyEngine()
+        hole = [parse_card('Ah'), parse_card('Kd')]
+        board = [parse_card(c) for c in ['Qs', '7h', '2c']]
+        for _ in range(2):
+            result = calc.calculate_equity(hole, board, 2)
+        for curve in calc.iter_equity_by_opponents(hole, board, 3, simulations=2000):
+            pass
+        river = board + [parse_card('9d'), parse_card('4c')]
+        assert calc.calculate_equity(hole, river, 1)['method'] == 'exact'
+        strategy.get_recommendation(result, 'BTN', 2, 'flop')
+
+        snap = instrumentation.snapshot()
+        timers, counters = snap['timers'], snap['counters']
+        assert timers['equity.calculate_equity']['calls'] == 3
+        assert timers['equity.iter_equity_by_opponents']['calls'] == 1
+        assert timers['equity.enumerate']['calls'] == 1
+        assert timers['strategy.get_recommendation']['calls'] == 1
+        if np is not None:
+            # The batched hot path, not the per-hand API, is what gets timed
+            assert timers['equity.simulate_numpy']['calls'] == timers['equity.simulate']['calls']
+            assert timers['evaluator.evaluate_strength_array']['calls'] > 0
+        else:
+            assert timers['equity.simulate_python']['calls'] == timers['equity.simulate']['calls']
+        assert counters['equity.simulations'] == 3000
+        assert counters['equity.method.monte_carlo'] == 2
+        assert counters['equity.method.exact'] == 1
+        assert counters['cache.hits'] == 1, "The repeated calculate_equity is a cache hit"
+        assert snap['derived']['sims_per_sec'] > 0
+        print(f"✓ {snap['derived']['sims_per_sec']:,} sims/sec, "
+              f"cache hit rate {snap['derived']['cache_hit_rate']:.0%}")
+
+        path = os.path.join(tempfile.mkdtemp(), 'profile.json')
+        with open(instrumentation.dump(path)) as f:
+            assert json.load(f)['timers'].keys() == timers.keys()
+        print("✓ Snapshot dumped to JSON")
+
+        # The pure-Python backend scores every trial through evaluate_strength_batch
+        EquityCalculator(simulations=200, backend='python', exact=False).calculate_equity(
+            hole, board, 2)
+        batch = instrumentation.snapshot()['timers']['evaluator.evaluate_strength_batch']
+        assert batch['calls'] >= 200
+        print(f"✓ Pure-Python evaluator time is visible: {batch['calls']} batches")
+    finally:
+        instrumentation.disable()
+
+    assert HandEvaluator.__dict__['evaluate_strength'] is original
+    assert EquityCalculator.calculate_equity is calculate
+    calls = instrumentation.snapshot()['timers']['evaluator.evaluate_strength']['calls']
+    HandEvaluator.evaluate_strength(hole, board)
+    assert instrumentation.snapshot()['timers']['evaluator.evaluate_strength']['calls'] == calls
+    print("✓ Disabling restores the original, uninstrumented methods")
+
+    print("\n✅ Instrumentation tests passed!\n")
+
+
+def test_batch_analysis():
+    """JSONL spots stream through the headless analyzer in input order"""
+    print("=" * 50)
+    print("TESTING BATCH ANALYSIS")
+    print("=" * 50)
+
+    assert batch_analysis.parse_cards('Ah Kd') == batch_analysis.parse_cards(['Ah', 'Kd'])
+    lines = [
+        json.dumps({'id': 'a', 'hole': ['Ah', 'Kd'], 'board': 'Qs7h2c', 'position': 'BTN',
+                    'opponents': 2, 'facing_bet': True, 'tightness': 0.8}),
+        '',
+        json.dumps({'hole': 'AsAc', 'opponents': 1}),
+        'not json',
+        json.dumps({'hole': 'AhAh'}),
+        json.dumps({'hole': 'AhKd', 'board': '2c3c'}),
+    ]
+    results = list(batch_analysis.analyze_stream(iter(lines), simulations=500, seed=4))
+    assert [r['id'] for r in results] == ['a', 3, 4, 5, 6]
+    assert results[0]['street'] == 'flop' and results[0]['action']
+    assert results[1]['street'] == 'preflop' and results[1]['equity'] > 75
+    assert all('error' in r for r in results[2:])
+    print(f"✓ {len(results)} lines in, {len(results)} results out; bad lines reported, not fatal")
+
+    spots = [json.dumps({'id': i, 'hole': 'Ah Kd', 'board': 'Qs 7h 2c', 'opponents': 1 + i % 3})
+             for i in range(12)]
+    parallel = list(batch_analysis.analyze_stream(spots, workers=2, chunk_size=3,
+                                                  simulations=300, seed=4))
+    assert [r['id'] for r in parallel] == list(range(12))
+    print("✓ Worker results come back in input order")
+
+    # Chunks are seeded by position, not by the worker that runs them
+    again = list(batch_analysis.analyze_stream(spots, workers=3, chunk_size=3,
+                                               simulations=300, seed=4))
+    assert again == parallel, "Seeded runs with workers are reproducible"
+    sequential = list(batch_analysis.analyze_stream(spots, chunk_size=3, simulations=300, seed=4))
+    assert sequential == parallel, "Seeded output doesn't depend on the worker count"
+    assert parallel[0]['win_pct'] != parallel[3]['win_pct'], "Chunks draw independent streams"
+    print("✓ Seeded runs repeat exactly, with or without workers")
+
+    # Out-of-range opponent counts are reported per spot and don't take down the pool
+    bad = [json.dumps({'id': i, 'hole': 'AhKd', 'opponents': n}) for i, n in enumerate((0, 30))]
+    mixed = list(batch_analysis.analyze_stream(bad + spots[:2], workers=2, chunk_size=1,
+                                               simulations=200, seed=4))
+    assert [r['id'] for r in mixed] == [0, 1, 0, 1]
+    assert all('opponents must be 1-9' in r['error'] for r in mixed[:2])
+    assert not any('error' in r for r in mixed[2:])
+    print("✓ Invalid opponent counts become error records under workers")
+
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, 'spots.jsonl')
+    output = os.path.join(folder, 'results.jsonl')
+    with open(source, 'w') as f:
+        f.write('\n'.join(spots[:3]) + '\n')
+    assert batch_analysis.main([source, '--output', output, '--simulations', '200']) == 0
+    with open(output) as f:
+        assert [json.loads(line)['id'] for line in f] == [0, 1, 2]
+    print("✓ CLI reads a JSONL file and writes JSONL results")
+
+    print("\n✅ Batch analysis tests passed!\n")
+
+
+def test_cold_start():
+    """The engine imports without ui and without building its tables"""
+    print("=" * 50)
+    print("TESTING COLD START")
+    print("=" * 50)
+
+    steps = benchmark.bench_cold_start(repeat=1, steps=['engine_import', 'first_equity'])
+    engine = steps['engine_import']
+    assert not engine['ui'], "The engine must not import Pythonista's ui module"
+    assert not engine['tables'] and not engine['preflop_table'], "Tables load on first use"
+    assert engine['within_budget'], f"Engine import took {engine['ms']} ms"
+    print(f"✓ Engine import: {engine['ms']} ms (budget {engine['budget_ms']} ms), no ui, no tables")
+
+    first = steps['first_equity']
+    assert first['tables'] and first['within_budget'], f"First equity took {first['ms']} ms"
+    print(f"✓ First flop equity from cold: {first['ms']} ms (budget {first['budget_ms']} ms)")
+
+    print("\n✅ Cold start tests passed!\n")
+
+
+async def _http(port, method, path, body=None):
+    """Minimal HTTP client for the equity service tests"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_equity_service():
+    """Identical in-flight requests are coalesced and the rest answered as they finish"""
+    print("=" * 50)
+    print("TESTING EQUITY SERVICE")
+    print("=" * 50)
+
+    async def scenario():
+        service = EquityService(EquityCalculator(seed=24, cache_size=64), simulations=3000)
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            spot = {'hole': 'AhKd', 'board': 'Qs7h2c', 'opponents': 2}
+            responses = await asyncio.gather(
+                *[_http(port, 'POST', '/equity', spot) for _ in range(8)],
+                *[_http(port, 'POST', '/recommend', dict(spot, opponents=n, position='CO'))
+                  for n in (1, 3)]
+            )
+            bad = await _http(port, 'POST', '/equity', {'hole': 'AhAh'})
+            missing = await _http(port, 'GET', '/nope')
+            await _http(port, 'GET', '/nope?again=1')
+            capped = await _http(port, 'POST', '/equity', dict(spot, simulations=10 ** 9))
+            _, stats = await _http(port, 'GET', '/stats')
+
+            # A quick job answers without waiting for a slow one queued behind it
+            quick = asyncio.ensure_future(service.equity(dict(spot, simulations=500)))
+            slow = asyncio.ensure_future(service.equity(dict(spot, opponents=3,
+                                                             simulations=200000)))
+            done, _ = await asyncio.wait([quick, slow], return_when=asyncio.FIRST_COMPLETED)
+            assert done == {quick} and not slow.done(), "Quick job waited for a slow one"
+            await slow
+            assert service.counters['jobs'] == stats['counters']['jobs'] + 2
+            assert not service._inflight
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+        return responses, bad, missing, capped, stats
+
+    responses, bad, missing, capped, stats = asyncio.run(scenario())
+    assert all(status == 200 for status, _ in responses)
+    equities = [body for _, body in responses[:8]]
+    assert all(e == equities[0] for e in equities), "Coalesced requests share one result"
+    assert responses[-1][1]['recommendation']['action']
+    assert bad[0] == 400 and 'Duplicate' in bad[1]['error'] and missing[0] == 404
+    assert capped[0] == 400 and 'simulations' in capped[1]['error']
+
+    counters = stats['counters']
+    assert counters['coalesced'] == 7, counters
+    assert counters['jobs'] == 3, counters
+    assert stats['endpoints']['/equity']['requests'] == 10
+    assert stats['endpoints']['/equity']['errors'] == 2
+    assert sorted(stats['endpoints']) == ['/equity', '/recommend', 'other'], "Unknown paths share one bucket"
+    assert stats['endpoints']['other']['errors'] == 2
+    print(f"✓ {counters['requests']} requests -> {counters['jobs']} jobs; "
+          f"/equity p50 {stats['endpoints']['/equity']['p50_ms']} ms")
+    print("✓ Jobs answer as they finish; simulations are capped")
+
+    print("\n✅ Equity service tests passed!\n")
+
+
+def test_async_equity():
+    """Awaitable equity yields to the event loop, reports progress and cancels"""
+    print("=" * 50)
+    print("TESTING ASYNC EQUITY")
+    print("=" * 50)
+
+    hole = [parse_card('Ah'), parse_card('Kd')]
+    board = [parse_card(c) for c in ['Qs', '7h', '2c']]
+
+    async def scenario():
+        calc = EquityCalculator(simulations=4000, seed=25, backend='python')
+        try:
+            seen = []
+            result = await calc.calculate_equity_async(hole, board, 2, progress=seen.append,
+                                                       chunk_size=1000)
+            assert [r['simulations'] for r in seen] == [1000, 2000, 3000, 4000]
+            assert result is seen[-1] and result['final']
+            print(f"✓ Progress after every chunk; final {result['equity']}% over 4000 trials")
+
+            # The loop keeps running while chunks simulate
+            ticks = 0
+            task = asyncio.ensure_future(
+                calc.quick_equity_async(hole, board, 3, simulations=20000, progress=seen.append)
+            )
+            while not task.done():
+                await asyncio.sleep(0)
+                ticks += 1
+            assert task.result()['simulations'] == 20000 and ticks > 1
+            print(f"✓ Event loop ran {ticks} times during a 20000-trial analysis")
+
+            # Cancelling stops the simulation after the chunk in progress
+            calc.simulations = 10 ** 7
+            partial = []
+            task = asyncio.ensure_future(
+                calc.calculate_equity_async(hole, board, 3, progress=partial.append,
+                                            chunk_size=2000)
+            )
+            while len(partial) < 2:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            try:
+                await task
+                assert False, "Task should have been cancelled"
+            except asyncio.CancelledError:
+                pass
+            stopped_at = len(partial)
+            await asyncio.sleep(0.1)
+            assert len(partial) == stopped_at and not partial[-1]['final']
+            print(f"✓ Cancelled after {partial[-1]['simulations']} of 10,000,000 trials")
+
+            results = await asyncio.gather(*[
+                calc.quick_equity_async(hole, board, k, simulations=2000) for k in (1, 2, 3)
+            ])
+            assert [r['simulations'] for r in results] == [2000] * 3
+            assert results[0]['equity'] > results[2]['equity']
+            print("✓ Concurrent analyses share one loop and one calculator")
+        finally:
+            calc.close()
+
+    asyncio.run(scenario())
+
+    print("\n✅ Async equity tests passed!\n")
+
+
 def test_full_hand_scenario():
     """Test a complete hand from pre-flop to river"""
     print("=" * 50)
@@ -208,8 +1363,33 @@ if __name__ == '__main__':
 
     try:
         test_hand_evaluator()
+        test_lookup_evaluator_matches_exhaustive()
+        test_card_interning()
+        test_batch_evaluation()
+        test_hand_strength()
         test_equity_calculator()
+        test_vectorized_equity()
+        test_dealing()
+        test_exact_equity()
+        test_parallel_equity()
+        test_preflop_equity_table()
+        test_adaptive_equity()
+        test_timed_equity()
+        test_streaming_equity()
+        test_equity_by_opponents()
+        test_equity_cache()
+        test_persistent_equity_cache()
+        test_range_equity()
         test_strategy_engine()
+        test_analysis_pipeline()
+        test_analysis_worker()
+        test_runout_speculation()
+        test_benchmark()
+        test_instrumentation()
+        test_batch_analysis()
+        test_cold_start()
+        test_equity_service()
+        test_async_equity()
         test_full_hand_scenario()
 
         print("=" * 50)
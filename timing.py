@@ -0,0 +1,20 @@
+"""
+Timing
+Latency summaries shared by the benchmarks and the equity service
+"""
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def latency_stats(seconds):
+    """p50/p99/mean of a list of durations, in milliseconds"""
+    return {
+        'p50_ms': round(percentile(seconds, 50) * 1000, 3),
+        'p99_ms': round(percentile(seconds, 99) * 1000, 3),
+        'mean_ms': round(sum(seconds) / len(seconds) * 1000, 3),
+    }